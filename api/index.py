@@ -1,6 +1,7 @@
 """
 Vercel serverless entry — API only. Frontend is served as static.
 """
+import asyncio
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,20 +16,31 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "")
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.database import engine, Base
+from app.database import settings, shard_map
+from app.middleware.compression import CompressionMiddleware
+from app.migrations import migrate_shards
+from app.middleware.rate_limit import RateLimiter, RateLimitMiddleware
+from app.routers import admin
+from app.routers import analytics
 from app.routers import debts
+from app.routers import metrics
 from app.routers import stripe_router
+from app.services.events import close_on_server_shutdown, debt_events
+from app.services.query_log import SlowQueryLog
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        Base.metadata.create_all(bind=engine)
-        from app.database import migrate_sqlite_add_repayment_columns
-        migrate_sqlite_add_repayment_columns()
+        if settings.run_migrations_on_startup:
+            migrate_shards(shard_map)
     except Exception:
         pass  # Don't crash on DB init (e.g. no Postgres configured)
+    close_on_server_shutdown(debt_events)
+    event_feed = asyncio.create_task(debt_events.run())
     yield
+    debt_events.close()
+    event_feed.cancel()
 
 
 app = FastAPI(
@@ -40,6 +52,13 @@ app = FastAPI(
     openapi_url="/api/openapi.json",
 )
 
+# Added before CORS so that 429/503 responses still carry CORS headers
+app.state.rate_limiter = RateLimiter.from_settings(settings)
+app.state.slow_queries = SlowQueryLog(settings.slow_query_threshold_ms)
+app.state.slow_queries.install_shards(shard_map)
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, limiter=app.state.rate_limiter, path_prefix="/api")
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -47,6 +66,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
 
 
 @app.exception_handler(ValueError)
@@ -65,6 +85,9 @@ async def internal_error_handler(request: Request, exc: Exception):
 # Mount under /api so frontend can call /api/debts, /api/stripe, etc.
 app.include_router(debts.router, prefix="/api")
 app.include_router(stripe_router.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 
 @app.get("/api/health")
@@ -1,16 +1,64 @@
 """
-Database configuration with SQLite (local) and optional PostgreSQL support.
+Database configuration with SQLite (local) and optional PostgreSQL support,
+read replica routing and provider-keyed sharding.
 """
+import hashlib
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+from fastapi import Request, Response
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     """Application settings with environment variable support."""
     database_url: str = "sqlite:///./medical_debt.db"
+    # Optional read replica for GET routes; reads use the primary when empty
+    database_replica_url: str = ""
+    # After a write, the client reads from the primary for this many seconds (read-your-writes)
+    replica_stickiness_seconds: int = 5
     stripe_secret_key: str = ""
+    # Apply pending schema migrations at startup (a single SELECT when up to date).
+    # Disable when migrations are run separately: python -m app.migrations upgrade
+    run_migrations_on_startup: bool = True
+    # Responses smaller than this (bytes) are sent uncompressed
+    compression_min_size: int = 500
+    # Archival: debts whose plan ended and idle for the grace period move to medical_debts_archive
+    archive_interval_seconds: int = 3600  # 0 disables the background task
+    archive_grace_days: int = 90
+    # The SSE change feed is per process unless shared through Redis. Without it and with
+    # several workers, streams send a `reset` this often so clients reload changes made
+    # through other workers (0 = never).
+    events_redis_url: str = ""
+    event_resync_seconds: int = 0
+    # Admission control. Keep the concurrency cap below the DB pool size (5 + 10 overflow)
+    # so excess load is shed with 503 instead of queueing on pool checkout.
+    rate_limit_enabled: bool = True
+    rate_limit_redis_url: str = ""  # shared buckets across workers; in-memory if empty
+    # Comma-separated proxy IPs/CIDRs whose X-Forwarded-For is believed ("*" = any peer,
+    # e.g. on Vercel). Empty: clients are identified by peer address only.
+    trusted_proxies: str = ""
+    max_concurrent_requests: int = 12
+    max_client_concurrent_requests: int = 4
+    # Open SSE change-feed streams (not counted above: they stay open for minutes)
+    max_event_streams: int = 200
+    max_client_event_streams: int = 4
+    # Diagnostics: statements slower than this are logged with their query plan
+    # (0 logs every statement, negative disables). Served at /admin/slow-queries.
+    slow_query_threshold_ms: float = 100.0
+    admin_token: str = ""  # if set, /admin routes require X-Admin-Token
+    # Sharding: extra databases by shard number; the main database is shard 0.
+    # DATABASE_SHARDS='{"1": "sqlite:///./shard1.db"}'. Providers are hashed across all
+    # shards unless pinned, e.g. TENANT_SHARDS='{"Carle Hospital": 1}'.
+    database_shards: dict[int, str] = {}
+    tenant_shards: dict[str, int] = {}
 
     class Config:
         env_file = ".env"
@@ -25,47 +73,232 @@ if os.getenv("VERCEL") and database_url.startswith("sqlite"):
     # Vercel: use /tmp (ephemeral) if no Postgres — app won't crash, but data won't persist
     database_url = "sqlite:////tmp/medical_debt.db"
 
-# SQLite needs special config for async-like behavior (check_same_thread=False)
-connect_args = {}
-if database_url.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
 
-engine = create_engine(
-    database_url,
-    connect_args=connect_args,
-    echo=False,  # Set True for SQL debugging
-)
+
+def _create_engine(url: str):
+    # SQLite needs special config for async-like behavior (check_same_thread=False)
+    connect_args = {}
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        echo=False,  # Set True for SQL debugging
+    )
+
+
+engine = _create_engine(database_url)
+# Replica for read-only routes; falls back to the primary engine when not configured
+read_engine = _create_engine(settings.database_replica_url) if settings.database_replica_url else engine
+
+
+class ReadOnlySession(Session):
+    """Session for replica reads — refuses to flush pending changes."""
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError("Attempted to write through a read-only session")
+        super().flush(objects)
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(class_=ReadOnlySession, autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency for FastAPI - yields database session."""
-    db = SessionLocal()
+def dispose_engines(close: bool = False) -> None:
+    """
+    Drop pooled connections. After a fork, call with close=False so the child
+    opens fresh connections without closing the parent's sockets.
+    """
+    for shard in shard_map:
+        shard.engine.dispose(close=close)
+        if shard.read_engine is not shard.engine:
+            shard.read_engine.dispose(close=close)
+
+
+# --- Read/write routing ---
+
+PRIMARY_STICKY_COOKIE = "medipay_primary_until"
+
+
+def stick_to_primary(response: Response) -> None:
+    """Call after a write: route this client's reads to the primary until the replica catches up."""
+    if read_engine is engine:
+        return
+    until = int(time.time()) + settings.replica_stickiness_seconds
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE,
+        str(until),
+        max_age=settings.replica_stickiness_seconds,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        return int(request.cookies.get(PRIMARY_STICKY_COOKIE, "0")) >= time.time()
+    except ValueError:
+        return False
+
+
+# --- Sharding ---
+
+# Debt ids carry their shard in the high bits: shard N allocates from N << 40 upward
+# (reserved by app.migrations.migrate_shards), so an id routes without a lookup and
+# shard 0 keeps the ids of an unsharded database. 2**13 shards stay below 2**53 for JS clients.
+SHARD_ID_BITS = 40
+MAX_SHARDS = 2 ** 13
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def tenant_key(provider: str) -> str:
+    """Provider name as used for shard routing; matches the dedup fingerprint's normalization."""
+    return _WHITESPACE.sub(" ", provider.strip()).casefold()
+
+
+def shard_of_id(debt_id: int) -> int:
+    return debt_id >> SHARD_ID_BITS
+
+
+@dataclass(frozen=True)
+class Shard:
+    id: int
+    engine: Engine
+    read_engine: Engine
+
+    @property
+    def id_start(self) -> int:
+        """First debt id this shard allocates."""
+        return self.id << SHARD_ID_BITS
+
+
+class ShardMap:
+    """
+    Which shard holds a provider's debts: pinned tenants go to their shard, the rest
+    are spread by a stable hash of the provider name. Adding shards moves hashed
+    providers, so pin existing tenants before growing the map.
+    """
+
+    def __init__(self, shards: list[Shard], pinned: dict[str, int] | None = None) -> None:
+        self.shards = {shard.id: shard for shard in sorted(shards, key=lambda s: s.id)}
+        if len(self.shards) != len(shards):
+            raise ValueError("Duplicate shard ids (DATABASE_SHARDS must not redefine shard 0)")
+        for shard_id in self.shards:
+            if not 0 <= shard_id < MAX_SHARDS:
+                raise ValueError(f"Shard id {shard_id} out of range 0..{MAX_SHARDS - 1}")
+        self.pinned = {tenant_key(provider): shard_id for provider, shard_id in (pinned or {}).items()}
+        unknown = set(self.pinned.values()) - set(self.shards)
+        if unknown:
+            raise ValueError(f"TENANT_SHARDS refers to unknown shard(s): {sorted(unknown)}")
+        self._hashed = list(self.shards.values())
+
+    def __iter__(self):
+        return iter(self.shards.values())
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def for_provider(self, provider: str) -> Shard:
+        key = tenant_key(provider)
+        if key in self.pinned:
+            return self.shards[self.pinned[key]]
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return self._hashed[int.from_bytes(digest[:8], "big") % len(self._hashed)]
+
+    def for_id(self, debt_id: int) -> Shard | None:
+        return self.shards.get(shard_of_id(debt_id))
+
+
+def _extra_shard(shard_id: int, url: str) -> Shard:
+    shard_engine = _create_engine(url)
+    return Shard(shard_id, shard_engine, shard_engine)  # replicas are configured for shard 0 only
+
+
+shard_map = ShardMap(
+    [Shard(0, engine, read_engine)] + [_extra_shard(n, url) for n, url in settings.database_shards.items()],
+    settings.tenant_shards,
+)
+_fan_out_pool: ThreadPoolExecutor | None = None
+
+
+def shard_session_factories() -> list:
+    """One session factory per shard primary, for background jobs and scripts."""
+    return [partial(SessionLocal, bind=shard.engine) for shard in shard_map]
+
+
+class ShardSessions:
+    """
+    Sessions for one request, opened lazily on the shards it touches and closed
+    together. Read-only instances use shard 0's replica unless `primary_reads`.
+    """
+
+    def __init__(self, shards: ShardMap, read_only: bool = False, primary_reads: bool = False) -> None:
+        self.shards = shards
+        self.read_only = read_only
+        self.primary_reads = primary_reads
+        self._open: dict[int, Session] = {}
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def session(self, shard: Shard) -> Session:
+        if shard.id not in self._open:
+            if self.read_only:
+                bind = shard.engine if self.primary_reads else shard.read_engine
+                self._open[shard.id] = ReadSessionLocal(bind=bind)
+            else:
+                self._open[shard.id] = SessionLocal(bind=shard.engine)
+        return self._open[shard.id]
+
+    def for_provider(self, provider: str) -> Session:
+        return self.session(self.shards.for_provider(provider))
+
+    def for_id(self, debt_id: int) -> Session | None:
+        """Session on the shard that allocated `debt_id`, or None if no such shard."""
+        shard = self.shards.for_id(debt_id)
+        return self.session(shard) if shard else None
+
+    def fan_out(self, fn) -> list:
+        """Run fn(session) on every shard, concurrently when there are several; results in shard order."""
+        sessions = [self.session(shard) for shard in self.shards]
+        if len(sessions) == 1:
+            return [fn(sessions[0])]
+        global _fan_out_pool
+        if _fan_out_pool is None:
+            _fan_out_pool = ThreadPoolExecutor(max_workers=min(32, 4 * len(sessions)), thread_name_prefix="shard")
+        return list(_fan_out_pool.map(fn, sessions))
+
+    def commit(self) -> None:
+        """Commit every open session. Shards commit one after another, not atomically."""
+        for db in self._open.values():
+            db.commit()
+
+    def rollback(self) -> None:
+        for db in self._open.values():
+            db.rollback()
+
+    def close(self) -> None:
+        for db in self._open.values():
+            db.close()
+        self._open.clear()
+
+
+def get_shards():
+    """Dependency for write routes - sessions on the shards' primaries."""
+    shards = ShardSessions(shard_map)
     try:
-        yield db
+        yield shards
     finally:
-        db.close()
+        shards.close()
 
 
-def migrate_sqlite_add_repayment_columns():
-    """Add new repayment columns to existing SQLite DB if missing."""
-    if not database_url.startswith("sqlite"):
-        return
-    from sqlalchemy import text, inspect
-    insp = inspect(engine)
-    if "medical_debts" not in insp.get_table_names():
-        return
-    cols = [c["name"] for c in insp.get_columns("medical_debts")]
-    for col, typ, default in [
-        ("interest_rate", "FLOAT", "0"),
-        ("down_payment", "FLOAT", "0"),
-        ("repayment_months", "INTEGER", "24"),
-        ("total_interest", "FLOAT", "0"),
-    ]:
-        if col in cols:
-            continue
-        with engine.connect() as conn:
-            conn.execute(text(f"ALTER TABLE medical_debts ADD COLUMN {col} {typ} DEFAULT {default}"))
-            conn.commit()
\ No newline at end of file
+def get_read_shards(request: Request):
+    """Dependency for read-only routes - replica sessions, or primaries right after this client wrote."""
+    shards = ShardSessions(shard_map, read_only=True, primary_reads=_reads_from_primary(request))
+    try:
+        yield shards
+    finally:
+        shards.close()
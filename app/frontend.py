@@ -0,0 +1,112 @@
+"""
+Serving helpers for the built React frontend (frontend/dist).
+"""
+import hashlib
+import mimetypes
+import os
+import threading
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.middleware.compression import parse_accept_encoding
+
+# Vite emits content-hashed filenames under /assets, so they never change in place.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SIDECAR_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves `.br` / `.gz` sidecars when the client accepts them,
+    and stamps every response with a fixed Cache-Control header.
+    """
+
+    def __init__(self, *args, cache_control: str | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = self._sidecar_response(full_path, scope, status_code)
+        if response is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            # The identity body is one of several representations; shared caches must key on encoding
+            if self._has_sidecar(full_path):
+                response.headers["Vary"] = "Accept-Encoding"
+        if self.cache_control:
+            response.headers["Cache-Control"] = self.cache_control
+        return response
+
+    def _sidecar_response(self, full_path, scope: Scope, status_code: int) -> Response | None:
+        request_headers = Headers(scope=scope)
+        if "range" in request_headers:
+            return None
+        for encoding in self._accepted_encodings(request_headers.get("accept-encoding", "")):
+            sidecar = f"{full_path}{SIDECAR_SUFFIXES[encoding]}"
+            try:
+                sidecar_stat = os.stat(sidecar)
+            except OSError:
+                continue
+            media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+            response = FileResponse(
+                sidecar,
+                status_code=status_code,
+                stat_result=sidecar_stat,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+    @staticmethod
+    def _has_sidecar(full_path) -> bool:
+        return any(os.path.exists(f"{full_path}{suffix}") for suffix in SIDECAR_SUFFIXES.values())
+
+    @staticmethod
+    def _accepted_encodings(accept_encoding: str) -> list[str]:
+        """Sidecar encodings to probe, best first (brotli sidecars need no brotli module)."""
+        accepted = parse_accept_encoding(accept_encoding)
+        return [enc for enc in ("br", "gzip") if accepted.get(enc, 0) > 0]
+
+
+class SpaIndex:
+    """In-memory copy of index.html for the SPA routes, reloaded when the file changes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._body = b""
+        self._etag = ""
+
+    def _load(self) -> tuple[bytes, str]:
+        mtime = self.path.stat().st_mtime
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    body = self.path.read_bytes()
+                    self._etag = f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+                    self._body = body
+                    self._mtime = mtime
+        return self._body, self._etag
+
+    def response(self, request: Request) -> Response:
+        """Return index.html, or 304 if the client's copy is current."""
+        body, etag = self._load()
+        # index.html references hashed assets, so browsers must revalidate it each time.
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="text/html", headers=headers)
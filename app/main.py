@@ -1,17 +1,27 @@
 """
 MediPay — FastAPI application with REST endpoints + React frontend.
 """
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-
-from app.database import engine, Base
+from fastapi.responses import JSONResponse
+
+from app.database import dispose_engines, settings, shard_map, shard_session_factories
+from app.frontend import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles, SpaIndex
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.rate_limit import RateLimiter, RateLimitMiddleware
+from app.migrations import migrate_shards
+from app.routers import admin
+from app.routers import analytics
 from app.routers import debts
+from app.routers import metrics
 from app.routers import stripe_router
+from app.services.archive import archive_periodically
+from app.services.events import close_on_server_shutdown, debt_events
+from app.services.query_log import SlowQueryLog
 import os
 from dotenv import load_dotenv
 import stripe
@@ -22,12 +32,25 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create tables on startup; migrate existing DBs for new columns."""
-    Base.metadata.create_all(bind=engine)
-    from app.database import migrate_sqlite_add_repayment_columns
-    migrate_sqlite_add_repayment_columns()
+    """Apply pending schema migrations on startup; run the archiver and change feed in the background."""
+    if settings.run_migrations_on_startup:
+        migrate_shards(shard_map)
+    close_on_server_shutdown(debt_events)
+    event_feed = asyncio.create_task(debt_events.run())
+    archiver = None
+    if settings.archive_interval_seconds > 0:
+        archiver = asyncio.create_task(
+            archive_periodically(
+                shard_session_factories(), settings.archive_interval_seconds, settings.archive_grace_days
+            )
+        )
     yield
-    # Shutdown cleanup if needed
+    # Normally already closed when uvicorn began shutting down; other servers get here first
+    debt_events.close()
+    event_feed.cancel()
+    if archiver is not None:
+        archiver.cancel()
+    dispose_engines(close=True)
 
 
 app = FastAPI(
@@ -53,6 +76,14 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Admission control — per-client rate limits and a concurrency cap in front of the DB pool
+# (added before CORS so that 429/503 responses still carry CORS headers)
+app.state.rate_limiter = RateLimiter.from_settings(settings)
+app.state.slow_queries = SlowQueryLog(settings.slow_query_threshold_ms)
+app.state.slow_queries.install_shards(shard_map)
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, limiter=app.state.rate_limiter)
+
 # CORS — allow localhost (dev) and Vercel deployments
 app.add_middleware(
     CORSMiddleware,
@@ -63,6 +94,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON / HTML responses above the size threshold (brotli if installed, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
 
 # --- Custom Exception Handlers ---
 
@@ -88,20 +122,32 @@ async def internal_error_handler(request: Request, exc: Exception):
 
 app.include_router(debts.router)
 app.include_router(stripe_router.router)
+app.include_router(analytics.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
 
 # Serve React frontend (built from frontend/)
 _frontend_dist = Path(__file__).resolve().parent.parent / "frontend" / "dist"
 if _frontend_dist.exists():
-    app.mount("/assets", StaticFiles(directory=_frontend_dist / "assets"), name="assets")
+    # Hashed Vite assets: serve .br/.gz sidecars when present, cache forever
+    app.mount(
+        "/assets",
+        PrecompressedStaticFiles(
+            directory=_frontend_dist / "assets",
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+        ),
+        name="assets",
+    )
+    _spa_index = SpaIndex(_frontend_dist / "index.html")
 
     @app.get("/", tags=["root"])
-    def serve_app():
-        return FileResponse(_frontend_dist / "index.html")
+    def serve_app(request: Request):
+        return _spa_index.response(request)
 
     @app.get("/{path:path}", tags=["root"])
-    def serve_spa(path: str):
+    def serve_spa(path: str, request: Request):
         """Serve index.html for SPA client-side routes (API routes take precedence)."""
-        return FileResponse(_frontend_dist / "index.html")
+        return _spa_index.response(request)
 else:
     @app.get("/", tags=["root"])
     def root():
@@ -0,0 +1,376 @@
+"""
+Admission control: per-client token-bucket rate limits and a concurrency cap.
+
+Buckets live in a pluggable backend (in-memory by default, Redis when a URL is
+configured so limits are shared across workers). The concurrency cap is always
+per-process, since each process owns its own database connection pool.
+"""
+import ipaddress
+import json
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass, field
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket: refills `rate` tokens per second, holds at most `burst` tokens."""
+    rate: float
+    burst: int
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    """Rate limit applied to requests whose method and path match."""
+    name: str
+    path_prefix: str
+    limit: RateLimit
+    methods: tuple[str, ...] = ()  # empty = any method
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        return path == self.path_prefix or path.startswith(self.path_prefix + "/")
+
+
+DEFAULT_LIMIT = RateLimit(rate=20, burst=40)
+DEFAULT_ROUTE_LIMITS = (
+    # Each checkout session is a Stripe API call; keep well under the account quota
+    RouteLimit("stripe_checkout", "/stripe/create-checkout-session", RateLimit(rate=10 / 60, burst=5), ("POST",)),
+    RouteLimit("debts_write", "/debts", RateLimit(rate=5, burst=10), ("POST", "PATCH", "DELETE")),
+    # list_debts runs a filtered query plus a count per call
+    RouteLimit("debts_read", "/debts", RateLimit(rate=10, burst=20), ("GET",)),
+)
+# Long-lived streams: rate-limited on connect but not counted against the concurrency caps
+STREAMING_PATHS = ("/debts/events",)
+# Never limited: probes, docs, metrics and immutable static assets
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/assets")
+
+
+# --- Backends ---
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets. Subclass to share limits across processes."""
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        """Take one token from `key`. Return 0 if allowed, else seconds until a token is free."""
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Per-process buckets. Idle buckets (full again) are purged periodically."""
+
+    def __init__(self, purge_every: int = 10_000) -> None:
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._purge_every = purge_every
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(limit.burst), now))
+            tokens = min(float(limit.burst), tokens + (now - updated_at) * limit.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / limit.rate
+            self._calls += 1
+            if self._calls % self._purge_every == 0:
+                self._purge(now)
+        return wait
+
+    def _purge(self, now: float) -> None:
+        # Buckets idle this long have refilled under any configured rate; dropping them loses nothing.
+        stale = [k for k, (_, ts) in self._buckets.items() if now - ts > 300]
+        for k in stale:
+            del self._buckets[k]
+
+
+_REDIS_TOKEN_BUCKET = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Buckets shared by every worker through Redis (requires `pip install redis`).
+    While Redis is unreachable, limits fall back to per-process buckets.
+    """
+
+    def __init__(self, url: str, prefix: str = "medipay:ratelimit:", log_every: float = 60.0) -> None:
+        import redis.asyncio as redis  # optional dependency
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+        self._prefix = prefix
+        self._fallback = InMemoryBackend()
+        self._log_every = log_every
+        self._last_error_log = 0.0
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        try:
+            wait = await self._script(
+                keys=[self._prefix + key],
+                args=[limit.burst, limit.rate, time.time()],
+            )
+        except Exception:
+            now = time.monotonic()
+            if now - self._last_error_log >= self._log_every:
+                self._last_error_log = now
+                logger.exception("Redis rate-limit backend unavailable; using per-process buckets")
+            return await self._fallback.acquire(key, limit)
+        return float(wait)
+
+
+# --- Client identity ---
+
+class TrustedProxies:
+    """
+    Proxies allowed to set X-Forwarded-For, from a comma-separated list of IPs /
+    CIDRs. `*` trusts whatever peer connects (for platforms whose proxy addresses
+    are not fixed); hops inside the header are still checked against the list.
+    """
+
+    def __init__(self, spec: str = "") -> None:
+        entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+        self.any_peer = "*" in entries
+        self.networks = tuple(ipaddress.ip_network(e, strict=False) for e in entries if e != "*")
+
+    def __bool__(self) -> bool:
+        return self.any_peer or bool(self.networks)
+
+    def trusts(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.networks)
+
+    def trusts_peer(self, address: str) -> bool:
+        return self.any_peer or self.trusts(address)
+
+
+def client_id(scope: Scope, trusted: TrustedProxies | None = None) -> str:
+    """
+    Identify the caller by peer address. Behind trusted proxies, the right-most
+    X-Forwarded-For hop that is not itself a trusted proxy; hops to its left are
+    client-supplied and ignored.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not trusted or not trusted.trusts_peer(peer):
+        return peer
+    forwarded = Headers(scope=scope).get("x-forwarded-for")
+    if not forwarded:
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not trusted.trusts(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+# --- Limiter ---
+
+@dataclass
+class RateLimiter:
+    """Rate-limit rules, concurrency caps and the counters exported at /metrics."""
+    backend: RateLimitBackend = field(default_factory=InMemoryBackend)
+    route_limits: tuple[RouteLimit, ...] = DEFAULT_ROUTE_LIMITS
+    default_limit: RateLimit | None = DEFAULT_LIMIT
+    max_concurrency: int = 0  # 0 = unlimited
+    max_client_concurrency: int = 0
+    exempt_paths: tuple[str, ...] = EXEMPT_PATHS
+    streaming_paths: tuple[str, ...] = STREAMING_PATHS
+    max_streams: int = 0  # open streams on streaming_paths; 0 = unlimited
+    max_client_streams: int = 0
+    trusted_proxies: TrustedProxies = field(default_factory=TrustedProxies)
+
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    streams: int = 0
+    peak_streams: int = 0
+    allowed: Counter = field(default_factory=Counter)
+    rejected: Counter = field(default_factory=Counter)
+    _client_in_flight: Counter = field(default_factory=Counter)
+    _client_streams: Counter = field(default_factory=Counter)
+
+    @classmethod
+    def from_settings(cls, settings) -> "RateLimiter":
+        backend = RedisBackend(settings.rate_limit_redis_url) if settings.rate_limit_redis_url else InMemoryBackend()
+        return cls(
+            backend=backend,
+            max_concurrency=settings.max_concurrent_requests,
+            max_client_concurrency=settings.max_client_concurrent_requests,
+            max_streams=settings.max_event_streams,
+            max_client_streams=settings.max_client_event_streams,
+            trusted_proxies=TrustedProxies(settings.trusted_proxies),
+        )
+
+    def rule_for(self, method: str, path: str) -> tuple[str, RateLimit] | None:
+        for route in self.route_limits:
+            if route.matches(method, path):
+                return route.name, route.limit
+        if self.default_limit is None:
+            return None
+        return "default", self.default_limit
+
+    def is_exempt(self, path: str) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in self.exempt_paths)
+
+    def stats(self) -> dict:
+        """Snapshot of the admission counters."""
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_concurrency": self.max_concurrency,
+            "streams": self.streams,
+            "peak_streams": self.peak_streams,
+            "max_streams": self.max_streams,
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+        }
+
+    def render_prometheus(self) -> str:
+        """Counters in Prometheus text exposition format."""
+        lines = [
+            "# TYPE medipay_requests_in_flight gauge",
+            f"medipay_requests_in_flight {self.in_flight}",
+            "# TYPE medipay_requests_in_flight_peak gauge",
+            f"medipay_requests_in_flight_peak {self.peak_in_flight}",
+            "# TYPE medipay_streams_open gauge",
+            f"medipay_streams_open {self.streams}",
+            "# TYPE medipay_streams_open_peak gauge",
+            f"medipay_streams_open_peak {self.peak_streams}",
+            "# TYPE medipay_admission_allowed_total counter",
+        ]
+        lines += [f'medipay_admission_allowed_total{{rule="{k}"}} {v}' for k, v in sorted(self.allowed.items())]
+        lines.append("# TYPE medipay_admission_rejected_total counter")
+        lines += [f'medipay_admission_rejected_total{{reason="{k}"}} {v}' for k, v in sorted(self.rejected.items())]
+        return "\n".join(lines) + "\n"
+
+
+async def _reject(send: Send, status_code: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Admit or shed each request before it reaches a route (and the DB pool):
+    429 when the client exceeds its rate or concurrency share, 503 when the
+    process is at its concurrency cap. Long-lived streams have caps of their own.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, path_prefix: str = "") -> None:
+        self.app = app
+        self.limiter = limiter
+        self.path_prefix = path_prefix  # e.g. "/api" when routers are mounted under a prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter
+        path = scope["path"]
+        if self.path_prefix and path.startswith(self.path_prefix):
+            path = path[len(self.path_prefix):] or "/"
+        if limiter.is_exempt(path) or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        client = client_id(scope, limiter.trusted_proxies)
+        rule = limiter.rule_for(scope["method"], path)
+        if rule is not None:
+            name, limit = rule
+            wait = await limiter.backend.acquire(f"{name}:{client}", limit)
+            if wait > 0:
+                limiter.rejected[f"rate:{name}"] += 1
+                await _reject(send, 429, "Rate limit exceeded. Try again later.", wait)
+                return
+
+        if path in limiter.streaming_paths:
+            await self._stream(client, scope, receive, send)
+            return
+
+        # No awaits between the checks and the increment, so the caps hold on one event loop
+        if limiter.max_concurrency and limiter.in_flight >= limiter.max_concurrency:
+            limiter.rejected["overloaded"] += 1
+            await _reject(send, 503, "Server is busy. Please retry shortly.", 1)
+            return
+        if limiter.max_client_concurrency and limiter._client_in_flight[client] >= limiter.max_client_concurrency:
+            limiter.rejected["client_concurrency"] += 1
+            await _reject(send, 429, "Too many concurrent requests.", 1)
+            return
+
+        limiter.allowed[rule[0] if rule else "unlimited"] += 1
+        limiter.in_flight += 1
+        limiter.peak_in_flight = max(limiter.peak_in_flight, limiter.in_flight)
+        limiter._client_in_flight[client] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.in_flight -= 1
+            limiter._client_in_flight[client] -= 1
+            if limiter._client_in_flight[client] <= 0:
+                del limiter._client_in_flight[client]
+
+    async def _stream(self, client: str, scope: Scope, receive: Receive, send: Send) -> None:
+        """Open streams hold a connection and a subscriber for minutes, not milliseconds."""
+        limiter = self.limiter
+        if limiter.max_streams and limiter.streams >= limiter.max_streams:
+            limiter.rejected["streams"] += 1
+            await _reject(send, 503, "Too many open event streams. Please retry shortly.", 5)
+            return
+        if limiter.max_client_streams and limiter._client_streams[client] >= limiter.max_client_streams:
+            limiter.rejected["client_streams"] += 1
+            await _reject(send, 429, "Too many open event streams.", 5)
+            return
+
+        limiter.allowed["stream"] += 1
+        limiter.streams += 1
+        limiter.peak_streams = max(limiter.peak_streams, limiter.streams)
+        limiter._client_streams[client] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.streams -= 1
+            limiter._client_streams[client] -= 1
+            if limiter._client_streams[client] <= 0:
+                del limiter._client_streams[client]
@@ -0,0 +1,100 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in `schema_migrations`; when the database is
+already at the latest version, startup costs a single SELECT. Sharded
+deployments migrate every shard with `migrate_shards`. Run from the command
+line with `python -m app.migrations`.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.migrations.ops import is_postgres, reserve_id_range
+from app.migrations.versions import MIGRATIONS
+
+# Kept on its own MetaData so Base.metadata.create_all never touches it
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+# Arbitrary key for pg_advisory_lock so concurrent workers don't migrate twice
+_PG_LOCK_KEY = 726_314_001
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version, or 0 if the version table does not exist yet."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def applied_migrations(engine: Engine) -> list[dict]:
+    """Rows of the version table, oldest first."""
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(select(schema_migrations).order_by(schema_migrations.c.version))
+            return [dict(row) for row in rows.mappings()]
+    except DBAPIError:
+        return []
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    if not is_postgres(engine):
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_LOCK_KEY})
+
+
+def run_migrations(engine: Engine, target: int | None = None, log=None) -> list[int]:
+    """Apply pending migrations up to `target` (default: latest). Returns versions applied."""
+    target = LATEST_VERSION if target is None else target
+    if current_version(engine) >= target:
+        return []
+
+    applied = []
+    with _migration_lock(engine):
+        _metadata.create_all(bind=engine)
+        # Re-read under the lock: another worker may have finished first
+        version = current_version(engine)
+        for number, name, upgrade in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            if log:
+                log(f"Applying {number:04d}_{name}")
+            upgrade(engine)
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(version=number, name=name))
+            applied.append(number)
+    return applied
+
+
+def migrate_shards(shards, target: int | None = None, log=None) -> dict[int, list[int]]:
+    """
+    Migrate each shard and, when that applied anything, reserve its debt id range.
+    A new shard starts empty, so its first migration reserves the range; shards that
+    are up to date cost the usual single SELECT. Returns versions applied per shard id.
+    """
+    applied = {}
+    for shard in shards:
+        applied[shard.id] = run_migrations(shard.engine, target=target, log=log)
+        if applied[shard.id] and shard.id_start:
+            reserve_id_range(shard.engine, "medical_debts", shard.id_start)
+    return applied
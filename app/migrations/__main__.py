@@ -0,0 +1,50 @@
+"""
+Migration CLI — run schema changes outside the request path.
+
+    python -m app.migrations upgrade [--to VERSION]
+    python -m app.migrations current
+    python -m app.migrations history
+
+With DATABASE_SHARDS set, each command covers every shard.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from app.database import shard_map
+from app.migrations import LATEST_VERSION, MIGRATIONS, applied_migrations, current_version, migrate_shards
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command")
+    upgrade = sub.add_parser("upgrade", help="apply pending migrations")
+    upgrade.add_argument("--to", type=int, default=None, help="stop at this version")
+    sub.add_parser("current", help="print the applied version")
+    sub.add_parser("history", help="list migrations and whether they are applied")
+    args = parser.parse_args(argv)
+
+    label = (lambda shard: f"[shard {shard.id}] ") if len(shard_map) > 1 else (lambda shard: "")
+    if args.command in (None, "upgrade"):
+        applied = migrate_shards(shard_map, target=getattr(args, "to", None), log=print)
+        for shard in shard_map:
+            print(
+                f"{label(shard)}Applied {len(applied[shard.id])} migration(s). "
+                f"Now at version {current_version(shard.engine)}."
+            )
+    elif args.command == "current":
+        for shard in shard_map:
+            print(f"{label(shard)}{current_version(shard.engine)} (latest {LATEST_VERSION})")
+    elif args.command == "history":
+        for shard in shard_map:
+            done = {row["version"]: row["applied_at"] for row in applied_migrations(shard.engine)}
+            for number, name, _ in MIGRATIONS:
+                status = f"applied {done[number]:%Y-%m-%d %H:%M}" if number in done else "pending"
+                print(f"{label(shard)}{number:04d}_{name}  {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Idempotent schema operations for migrations (SQLite and PostgreSQL).
+
+Every op may safely run against a schema that already has the change, since a
+fresh database gets the current models from the initial migration.
+"""
+import time
+from typing import Callable
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+
+def is_postgres(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def add_column(engine: Engine, table: str, column: str, ddl_type: str, default: str | None = None) -> None:
+    """ALTER TABLE ... ADD COLUMN, skipped if the column exists."""
+    default_sql = f" DEFAULT {default}" if default is not None else ""
+    if is_postgres(engine):
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl_type}{default_sql}"))
+        return
+    if column in {c["name"] for c in inspect(engine).get_columns(table)}:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}{default_sql}"))
+
+
+def create_index(engine: Engine, name: str, table: str, columns: list[str], unique: bool = False) -> None:
+    """
+    Create an index without blocking writes where the database supports it.
+
+    PostgreSQL uses CREATE INDEX CONCURRENTLY, which cannot run inside a
+    transaction, so the statement is issued on an AUTOCOMMIT connection.
+    A failed concurrent build leaves an INVALID index behind; it is dropped
+    and rebuilt on the next run.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    cols = ", ".join(columns)
+    if is_postgres(engine):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            invalid = conn.execute(
+                text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ),
+                {"name": name},
+            ).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols})"))
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+
+
+def backfill(
+    engine: Engine,
+    table: str,
+    column: str,
+    compute: Callable[[dict], object],
+    source_columns: list[str],
+    batch_size: int = 1000,
+    pause: float = 0.0,
+) -> int:
+    """
+    Fill `column` for rows where it is NULL, in primary-key order, one batch per transaction.
+
+    `compute` receives a row dict of `source_columns` (plus `id`) and returns the new value.
+    Short transactions keep row locks brief so the backfill can run on a live table;
+    `pause` (seconds) throttles between batches. Returns the number of rows updated.
+    """
+    cols = ", ".join(["id", *source_columns])
+    select = text(
+        f"SELECT {cols} FROM {table} WHERE {column} IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+    )
+    update = text(f"UPDATE {table} SET {column} = :value WHERE id = :id")
+    last_id = 0
+    updated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select, {"last_id": last_id, "limit": batch_size}).mappings().all()
+            if not rows:
+                break
+            conn.execute(update, [{"id": row["id"], "value": compute(dict(row))} for row in rows])
+        last_id = rows[-1]["id"]
+        updated += len(rows)
+        if pause:
+            time.sleep(pause)
+    return updated
+
+
+def sqlite_rebuild_table(engine: Engine, table) -> None:
+    """
+    Recreate a SQLite table from its current model definition, copying the rows.
+
+    SQLite cannot ALTER table options (e.g. AUTOINCREMENT), so the old table is
+    renamed, its indexes dropped, the new one created and the shared columns copied.
+    """
+    if engine.dialect.name != "sqlite" or not inspect(engine).has_table(table.name):
+        return
+    old = f"_{table.name}_old"
+    with engine.begin() as conn:
+        old_columns = {c["name"] for c in inspect(conn).get_columns(table.name)}
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+        index_names = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"),
+            {"t": old},
+        ).scalars().all()
+        for name in index_names:
+            conn.execute(text(f"DROP INDEX {name}"))
+        table.create(conn)
+        cols = ", ".join(c.name for c in table.columns if c.name in old_columns)
+        conn.execute(text(f"INSERT INTO {table.name} ({cols}) SELECT {cols} FROM {old}"))
+        conn.execute(text(f"DROP TABLE {old}"))
+
+
+def reserve_id_range(engine: Engine, table: str, start: int) -> None:
+    """
+    Make `table`'s id sequence allocate from at least `start`, so each shard hands
+    out ids from its own range. Sequences already past `start` are left alone.
+    """
+    if start <= 0 or not inspect(engine).has_table(table):
+        return
+    with engine.begin() as conn:
+        if is_postgres(engine):
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+            last = conn.execute(text(f"SELECT last_value FROM {sequence}")).scalar()
+            if last < start:
+                conn.execute(text("SELECT setval(:s, :v, false)"), {"s": sequence, "v": start})
+            return
+        # AUTOINCREMENT tables (migration 4) take max(rowid, sqlite_sequence.seq) + 1
+        seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :t"), {"t": table}).scalar()
+        if seq is None:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :v)"), {"t": table, "v": start - 1})
+        elif seq < start - 1:
+            conn.execute(text("UPDATE sqlite_sequence SET seq = :v WHERE name = :t"), {"t": table, "v": start - 1})
@@ -0,0 +1,152 @@
+"""
+Ordered schema migrations. Append new ones at the end; never edit an applied one.
+"""
+from sqlalchemy.engine import Engine
+
+from sqlalchemy import text
+
+from app.migrations.ops import add_column, backfill, create_index, is_postgres, sqlite_rebuild_table
+
+
+def initial_schema(engine: Engine) -> None:
+    """Create any missing tables from the current models."""
+    from app import models  # noqa: F401 — registers tables on Base.metadata
+    from app.database import Base
+
+    Base.metadata.create_all(bind=engine)
+
+
+def repayment_columns(engine: Engine) -> None:
+    """Repayment fields added after the first release (previously patched in at startup)."""
+    for column, ddl_type, default in [
+        ("interest_rate", "FLOAT", "0"),
+        ("down_payment", "FLOAT", "0"),
+        ("repayment_months", "INTEGER", "24"),
+        ("total_interest", "FLOAT", "0"),
+    ]:
+        add_column(engine, "medical_debts", column, ddl_type, default)
+
+
+def created_at_index(engine: Engine) -> None:
+    """list_debts orders every page by created_at DESC."""
+    create_index(engine, "ix_medical_debts_created_at", "medical_debts", ["created_at"])
+
+
+def debt_archive(engine: Engine) -> None:
+    """Archive table for ended plans; SQLite hot table switched to AUTOINCREMENT so ids are never reused."""
+    from app.models import ArchivedDebt, MedicalDebt
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            ddl = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'medical_debts'")
+            ).scalar()
+        if ddl and "AUTOINCREMENT" not in ddl.upper():
+            sqlite_rebuild_table(engine, MedicalDebt.__table__)
+    ArchivedDebt.__table__.create(bind=engine, checkfirst=True)
+
+
+def provider_rollups(engine: Engine) -> None:
+    """Daily provider/risk-level rollup table, populated from existing debts."""
+    from sqlalchemy.orm import Session
+
+    from app.models import ProviderRiskDaily
+    from app.services.rollups import rebuild_rollups
+
+    ProviderRiskDaily.__table__.create(bind=engine, checkfirst=True)
+    with Session(bind=engine) as db:
+        rebuild_rollups(db)
+
+
+def debt_fingerprints(engine: Engine) -> None:
+    """
+    Dedup fingerprint with a unique index. Rows that already duplicate an earlier
+    row keep a NULL fingerprint (NULLs don't collide), so the index can be built.
+    """
+    from app.services.dedup import debt_fingerprint
+
+    add_column(engine, "medical_debts", "fingerprint", "VARCHAR(64)")
+    add_column(engine, "medical_debts_archive", "fingerprint", "VARCHAR(64)")
+    with engine.connect() as conn:
+        seen = set(conn.execute(text("SELECT fingerprint FROM medical_debts WHERE fingerprint IS NOT NULL")).scalars())
+
+    def first_occurrence(row: dict) -> str | None:
+        fingerprint = debt_fingerprint(row["patient_name"], row["provider"], row["debt_amount"])
+        if fingerprint in seen:
+            return None
+        seen.add(fingerprint)
+        return fingerprint
+
+    backfill(engine, "medical_debts", "fingerprint", first_occurrence, ["patient_name", "provider", "debt_amount"])
+    create_index(engine, "ux_medical_debts_fingerprint", "medical_debts", ["fingerprint"], unique=True)
+
+
+def bigint_debt_ids(engine: Engine) -> None:
+    """
+    Widen debt ids to BIGINT so shards can allocate from N << 40. SQLite INTEGER keys
+    are already 64-bit. On PostgreSQL ALTER COLUMN TYPE rewrites the table under an
+    exclusive lock, so run this one in a quiet period on large databases.
+    """
+    if not is_postgres(engine):
+        return
+    with engine.begin() as conn:
+        for table in ("medical_debts", "medical_debts_archive"):
+            data_type = conn.execute(
+                text(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_name = :t AND column_name = 'id'"
+                ),
+                {"t": table},
+            ).scalar()
+            if data_type == "integer":
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN id TYPE BIGINT"))
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('medical_debts', 'id')")).scalar()
+        if sequence:
+            # Also lifts MAXVALUE from the int4 default to the int8 one
+            conn.execute(text(f"ALTER SEQUENCE {sequence} AS BIGINT"))
+
+
+def normalized_rollup_keys(engine: Engine) -> None:
+    """
+    Key rollups on the normalized provider so that "Carle Hospital" and "carle  hospital"
+    are one provider in analytics, as they are for sharding and dedup. Existing buckets
+    are merged rather than rebuilt, keeping the history of edits and deletes.
+    """
+    from sqlalchemy import delete, select
+    from sqlalchemy.orm import Session
+
+    from app.database import tenant_key
+    from app.models import ProviderRiskDaily
+
+    add_column(engine, "provider_risk_daily", "provider_name", "VARCHAR(255)")
+    with Session(bind=engine) as db:
+        merged: dict[tuple, list] = {}
+        for row in db.scalars(select(ProviderRiskDaily)):
+            bucket = merged.setdefault(
+                (row.day, tenant_key(row.provider), row.risk_level), [row.provider_name or row.provider, 0, 0.0, 0.0]
+            )
+            bucket[1] += row.debt_count
+            bucket[2] += row.total_outstanding
+            bucket[3] += row.weighted_risk_sum
+        db.execute(delete(ProviderRiskDaily))
+        db.add_all(
+            ProviderRiskDaily(
+                day=day, provider=key, provider_name=name, risk_level=risk_level,
+                debt_count=n, total_outstanding=amount, weighted_risk_sum=weighted,
+            )
+            for (day, key, risk_level), (name, n, amount, weighted) in merged.items()
+        )
+        db.commit()
+
+
+# (version, name, upgrade)
+MIGRATIONS = [
+    (1, "initial_schema", initial_schema),
+    (2, "repayment_columns", repayment_columns),
+    (3, "created_at_index", created_at_index),
+    (4, "debt_archive", debt_archive),
+    (5, "provider_rollups", provider_rollups),
+    (6, "debt_fingerprints", debt_fingerprints),
+    (7, "bigint_debt_ids", bigint_debt_ids),
+    (8, "normalized_rollup_keys", normalized_rollup_keys),
+]
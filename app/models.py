@@ -2,15 +2,17 @@
 SQLAlchemy models for medical debt records.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Date, DateTime, Index
 from app.database import Base
 
+# Debt ids are 64-bit: shard N allocates from N << 40 (see app.database.SHARD_ID_BITS).
+# SQLite keeps INTEGER, which is already 64-bit and required for AUTOINCREMENT rowids.
+DebtId = BigInteger().with_variant(Integer, "sqlite")
 
-class MedicalDebt(Base):
-    """Medical debt record with computed risk and repayment fields."""
-    __tablename__ = "medical_debts"
 
-    id = Column(Integer, primary_key=True, index=True)
+class DebtColumns:
+    """Columns shared by the hot table and the archive."""
+    id = Column(DebtId, primary_key=True, index=True)
     
     # Input fields
     patient_name = Column(String(255), nullable=False, index=True)
@@ -28,11 +30,55 @@ class MedicalDebt(Base):
     risk_level = Column(String(50), nullable=False, index=True)
     recommended_monthly_payment = Column(Float, nullable=False)
     total_interest = Column(Float, default=0.0, nullable=False)  # total interest over life of plan
+    # sha256 of normalized (patient_name, provider, debt_amount); see app/services/dedup.py
+    fingerprint = Column(String(64), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+
+class MedicalDebt(DebtColumns, Base):
+    """Medical debt record with computed risk and repayment fields."""
+    __tablename__ = "medical_debts"
+
     __table_args__ = (
         Index("ix_debts_risk_provider", "risk_level", "provider"),
+        Index("ux_medical_debts_fingerprint", "fingerprint", unique=True),
+        # Never reuse ids on SQLite: archived debts keep theirs
+        {"sqlite_autoincrement": True},
     )
+
+
+class ArchivedDebt(DebtColumns, Base):
+    """Debt moved out of medical_debts once its plan has ended. Keeps the original id."""
+    __tablename__ = "medical_debts_archive"
+
+    id = Column(DebtId, primary_key=True, autoincrement=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ProviderRiskDaily(Base):
+    """
+    Daily per-provider / risk-level rollup of debt exposure, stored as deltas:
+    each debt write adds or subtracts its contribution on the day it happens,
+    so exposure as of a day is the running sum of all earlier buckets. Buckets
+    are keyed on the normalized provider (tenant_key), as sharding and dedup are.
+    """
+    __tablename__ = "provider_risk_daily"
+
+    day = Column(Date, primary_key=True)
+    provider = Column(String(255), primary_key=True)  # tenant_key(provider)
+    provider_name = Column(String(255))  # spelling last written, for display
+    risk_level = Column(String(50), primary_key=True)
+    debt_count = Column(Integer, default=0, nullable=False)
+    total_outstanding = Column(Float, default=0.0, nullable=False)  # debt_amount - down_payment
+    weighted_risk_sum = Column(Float, default=0.0, nullable=False)  # sum(risk_score * outstanding)
+
+    __table_args__ = (
+        Index("ix_provider_risk_daily_provider_day", "provider", "day"),
+    )
+
+
+# Columns copied verbatim when a debt is archived
+DEBT_COLUMNS = [c.name for c in MedicalDebt.__table__.columns]
@@ -0,0 +1,36 @@
+"""
+Admin diagnostics — slow-query log with query plans.
+"""
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+
+from app.database import settings
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    """Admin routes require X-Admin-Token matching ADMIN_TOKEN; they are closed when it is unset."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled. Set ADMIN_TOKEN to enable them.")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/slow-queries", summary="Slow statements by shape", dependencies=[Depends(require_admin)])
+def list_slow_queries(request: Request):
+    """Statements over the threshold, grouped by normalized shape, with their EXPLAIN output."""
+    log = request.app.state.slow_queries
+    return {"threshold_ms": log.threshold_ms, "enabled": log.enabled, "queries": log.report()}
+
+
+@router.delete(
+    "/slow-queries",
+    status_code=204,
+    summary="Clear the slow-query log",
+    dependencies=[Depends(require_admin)],
+)
+def reset_slow_queries(request: Request):
+    request.app.state.slow_queries.reset()
+    return None
@@ -0,0 +1,45 @@
+"""
+Provider risk-concentration analytics, served from the daily rollup table.
+Reads fan out over the shards and merge by provider: a provider re-hashed
+after shards were added has rollups on more than one.
+"""
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, Query
+
+from app.database import ShardSessions, get_read_shards
+from app.schemas import ProviderExposure, ProviderTrendResponse
+from app.services.rollups import provider_exposure_totals, provider_trend_totals, rank_exposure, trend_points
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get(
+    "/providers",
+    response_model=list[ProviderExposure],
+    summary="Exposure by provider",
+)
+def list_provider_exposure(
+    shards: ShardSessions = Depends(get_read_shards),
+    as_of: date | None = Query(None, description="Exposure at the end of this day (default: now)"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Total outstanding, weighted risk score and High-risk share per provider, largest first."""
+    return rank_exposure(shards.fan_out(lambda db: provider_exposure_totals(db, as_of=as_of)))[:limit]
+
+
+@router.get(
+    "/providers/{provider}/trend",
+    response_model=ProviderTrendResponse,
+    summary="Daily exposure trend for a provider",
+)
+def get_provider_trend(
+    provider: str,
+    shards: ShardSessions = Depends(get_read_shards),
+    days: int = Query(90, ge=1, le=730, description="Number of days ending today"),
+):
+    """One point per day: exposure as of the end of that day."""
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    per_shard = shards.fan_out(lambda db: provider_trend_totals(db, provider, start, end))
+    return ProviderTrendResponse(provider=provider, points=trend_points(per_shard, start))
@@ -1,11 +1,28 @@
 """
 Debt API endpoints - RESTful CRUD with filtering and pagination.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import heapq
+import json
+import time
+from itertools import islice
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import DateTime, cast, func, null, select, union_all
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import MedicalDebt
+from app.database import (
+    ShardSessions,
+    get_read_shards,
+    get_shards,
+    settings,
+    shard_map,
+    shard_of_id,
+    stick_to_primary,
+)
+from app.models import DEBT_COLUMNS, ArchivedDebt, MedicalDebt
 from app.schemas import (
     DebtCreate,
     DebtUpdate,
@@ -13,21 +30,47 @@ from app.schemas import (
     DebtCreateResponse,
     DebtSummary,
     DebtListResponse,
+    BulkDuplicate,
+    BulkImportResponse,
 )
+from app.services.dedup import debt_fingerprint, find_existing
+from app.services.events import CLOSED, debt_events, publish_debt_change
+from app.services.idempotency import debt_creation_keys, payload_hash
 from app.services.risk_engine import calculate_risk
+from app.services.rollups import contribution, record_debt_change, record_debt_changes
 
 router = APIRouter(prefix="/debts", tags=["debts"])
 
 
-@router.post(
-    "",
-    response_model=DebtCreateResponse,
-    status_code=201,
-    summary="Create medical debt record",
-    description="Submit a new medical debt for risk assessment and repayment planning.",
-)
-def create_debt(debt: DebtCreate, db: Session = Depends(get_db)):
-    """Create a medical debt record with computed risk and repayment plan."""
+def _shard_session(shards: ShardSessions, debt_id: int) -> Session:
+    """Session on the shard holding `debt_id`; 404 if the id belongs to no configured shard."""
+    db = shards.for_id(debt_id)
+    if db is None:
+        raise HTTPException(status_code=404, detail="Debt not found")
+    return db
+
+
+def _find_debt(db: Session, debt_id: int):
+    """Look up a debt in the hot table, falling back to the archive."""
+    record = db.query(MedicalDebt).filter(MedicalDebt.id == debt_id).first()
+    if record is None:
+        record = db.query(ArchivedDebt).filter(ArchivedDebt.id == debt_id).first()
+    return record
+
+
+def _debt_filters(model, risk_level: str | None, provider: str | None, patient_name: str | None) -> list:
+    conditions = []
+    if risk_level:
+        conditions.append(model.risk_level == risk_level)
+    if provider:
+        conditions.append(model.provider.ilike(f"%{provider}%"))
+    if patient_name:
+        conditions.append(model.patient_name.ilike(f"%{patient_name}%"))
+    return conditions
+
+
+def _build_record(debt: DebtCreate, fingerprint: str):
+    """New MedicalDebt with computed risk and repayment plan (not yet added to a session)."""
     result = calculate_risk(
         debt_amount=debt.debt_amount,
         income=debt.income,
@@ -49,11 +92,138 @@ def create_debt(debt: DebtCreate, db: Session = Depends(get_db)):
         risk_level=result.risk_level,
         recommended_monthly_payment=result.recommended_monthly_payment,
         total_interest=result.total_interest,
+        fingerprint=fingerprint,
     )
+    return record, result
+
+
+def _duplicate_error(existing_id: int | None) -> HTTPException:
+    detail = "Duplicate debt record"
+    if existing_id is not None:
+        detail += f": matches existing debt {existing_id}"
+    return HTTPException(status_code=409, detail=detail)
+
+
+def _serialize(record) -> dict:
+    return DebtResponse.model_validate(record).model_dump(mode="json")
+
+
+# --- Change feed ---
+
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def _sse(event_type: str, data: dict, event_id: str | None = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get(
+    "/events",
+    summary="Stream debt changes (Server-Sent Events)",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def debt_event_stream(
+    request: Request,
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Push debt.created / debt.updated / debt.deleted / debt.archived events as they happen.
+    Reconnecting clients send Last-Event-ID to resume; a `reset` event means the gap
+    could not be replayed and the client should reload its list. With EVENT_RESYNC_SECONDS
+    set (several workers without a shared Redis feed) a `reset` is also sent that often.
+    On server shutdown the stream ends with a final `reset`; the client reconnects elsewhere.
+    """
+    queue, replay = debt_events.subscribe(last_event_id)
+    resync = settings.event_resync_seconds
+
+    async def stream():
+        next_resync = time.monotonic() + resync if resync > 0 else None
+        try:
+            yield "retry: 3000\n\n"
+            if replay is None:
+                yield _sse("reset", {})
+            else:
+                for event in replay:
+                    yield _sse(event.type, event.data, event.id)
+            while True:
+                timeout = SSE_HEARTBEAT_SECONDS
+                if next_resync is not None:
+                    if time.monotonic() >= next_resync:
+                        next_resync = time.monotonic() + resync
+                        yield _sse("reset", {})
+                    timeout = min(timeout, max(0.0, next_resync - time.monotonic()))
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    if next_resync is None or time.monotonic() < next_resync:
+                        yield ": keep-alive\n\n"
+                    continue
+                if event is CLOSED:
+                    yield _sse("reset", {})
+                    return
+                if event is None:
+                    yield _sse("reset", {})
+                else:
+                    yield _sse(event.type, event.data, event.id)
+        finally:
+            debt_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "",
+    response_model=DebtCreateResponse,
+    status_code=201,
+    summary="Create medical debt record",
+    description="Submit a new medical debt for risk assessment and repayment planning.",
+)
+def create_debt(
+    debt: DebtCreate,
+    response: Response,
+    shards: ShardSessions = Depends(get_shards),
+    idempotency_key: str | None = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Retries with the same key and body replay the original response",
+    ),
+):
+    """Create a medical debt record with computed risk and repayment plan. Exact resubmissions get 409."""
+    request_hash = payload_hash(debt.model_dump())
+    if idempotency_key:
+        cached = debt_creation_keys.get(idempotency_key, request_hash)
+        if cached:
+            return JSONResponse(cached.body, status_code=cached.status_code, headers={"Idempotent-Replayed": "true"})
+
+    db = shards.for_provider(debt.provider)
+    fingerprint = debt_fingerprint(debt.patient_name, debt.provider, debt.debt_amount)
+    existing_id = find_existing(db, [fingerprint]).get(fingerprint)
+    if existing_id is not None:
+        raise _duplicate_error(existing_id)
+
+    record, result = _build_record(debt, fingerprint)
     db.add(record)
-    db.commit()
+    record_debt_change(db, None, contribution(record))
+    try:
+        db.commit()
+    except IntegrityError:
+        # An identical request won the race to the unique fingerprint index
+        db.rollback()
+        raise _duplicate_error(find_existing(db, [fingerprint]).get(fingerprint))
     db.refresh(record)
-    return DebtCreateResponse(
+    stick_to_primary(response)
+    publish_debt_change("debt.created", record.id, _serialize(record))
+    created = DebtCreateResponse(
         id=record.id,
         risk_score=record.risk_score,
         risk_level=record.risk_level,
@@ -62,6 +232,66 @@ def create_debt(debt: DebtCreate, db: Session = Depends(get_db)):
         amount_after_down_payment=result.amount_after_down_payment,
         estimated_payoff_months=result.estimated_payoff_months,
     )
+    if idempotency_key:
+        debt_creation_keys.put(idempotency_key, request_hash, 201, created.model_dump(mode="json"))
+    return created
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkImportResponse,
+    status_code=201,
+    summary="Bulk import debt records",
+    description="Create up to 1000 debts (one transaction per shard), skipping duplicates.",
+)
+def bulk_create_debts(
+    response: Response,
+    debts: list[DebtCreate] = Body(..., min_length=1, max_length=1000),
+    shards: ShardSessions = Depends(get_shards),
+):
+    """Import debts, skipping any already stored or repeated within the batch."""
+    fingerprints = [debt_fingerprint(d.patient_name, d.provider, d.debt_amount) for d in debts]
+    targets = [shards.for_provider(d.provider) for d in debts]
+    existing: dict[str, int] = {}
+    for db in dict.fromkeys(targets):
+        existing.update(find_existing(db, [fp for fp, target in zip(fingerprints, targets) if target is db]))
+
+    records = []
+    new_by_shard: dict[Session, list] = {}
+    duplicates = []
+    first_index: dict[str, int] = {}
+    for index, (debt, fingerprint, db) in enumerate(zip(debts, fingerprints, targets)):
+        if fingerprint in existing:
+            duplicates.append(BulkDuplicate(index=index, existing_id=existing[fingerprint]))
+            continue
+        if fingerprint in first_index:
+            duplicates.append(BulkDuplicate(index=index, duplicate_of_index=first_index[fingerprint]))
+            continue
+        first_index[fingerprint] = index
+        record, _ = _build_record(debt, fingerprint)
+        db.add(record)
+        records.append(record)
+        new_by_shard.setdefault(db, []).append((None, contribution(record)))
+    # One rollup upsert per touched bucket, not per imported row
+    for db, changes in new_by_shard.items():
+        record_debt_changes(db, changes)
+
+    # Flush every shard before committing any, so a conflict leaves nothing behind
+    try:
+        for db in dict.fromkeys(targets):
+            db.flush()
+    except IntegrityError:
+        shards.rollback()
+        raise HTTPException(status_code=409, detail="Some debts were created concurrently. Retry the import.")
+    # Capture ids and payloads before commit expires the instances
+    created = [(record.id, _serialize(record)) for record in records]
+    shards.commit()
+
+    if created:
+        stick_to_primary(response)
+    for debt_id, payload in created:
+        publish_debt_change("debt.created", debt_id, payload)
+    return BulkImportResponse(created=[debt_id for debt_id, _ in created], duplicates=duplicates)
 
 
 @router.get(
@@ -70,9 +300,9 @@ def create_debt(debt: DebtCreate, db: Session = Depends(get_db)):
     summary="Get debt by ID",
     responses={404: {"description": "Debt not found"}},
 )
-def get_debt(debt_id: int, db: Session = Depends(get_db)):
-    """Retrieve a single debt record by ID."""
-    record = db.query(MedicalDebt).filter(MedicalDebt.id == debt_id).first()
+def get_debt(debt_id: int, shards: ShardSessions = Depends(get_read_shards)):
+    """Retrieve a single debt record by ID (archived debts included)."""
+    record = _find_debt(_shard_session(shards, debt_id), debt_id)
     if not record:
         raise HTTPException(status_code=404, detail="Debt not found")
     return record
@@ -84,42 +314,87 @@ def get_debt(debt_id: int, db: Session = Depends(get_db)):
     summary="List debts with filtering and pagination",
 )
 def list_debts(
-    db: Session = Depends(get_db),
+    shards: ShardSessions = Depends(get_read_shards),
     risk_level: str | None = Query(None, description="Filter by risk level (Low, Medium, High)"),
     provider: str | None = Query(None, description="Filter by provider name (partial match)"),
     patient_name: str | None = Query(None, description="Search by patient name (partial match)"),
+    include_archived: bool = Query(False, description="Also return archived (ended) debts"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ):
     """List debt records with optional filters and pagination."""
-    query = db.query(MedicalDebt)
-    
-    if risk_level:
-        query = query.filter(MedicalDebt.risk_level == risk_level)
-    if provider:
-        query = query.filter(MedicalDebt.provider.ilike(f"%{provider}%"))
-    if patient_name:
-        query = query.filter(MedicalDebt.patient_name.ilike(f"%{patient_name}%"))
-    
-    total = query.count()
-    items = query.order_by(MedicalDebt.created_at.desc()).offset(offset).limit(limit).all()
-    
+    page = _page_with_archive if include_archived else _page_active
+    if len(shards) == 1:
+        total, items = page(shards, risk_level, provider, patient_name, limit, offset)
+    else:
+        # Each shard returns its newest offset + limit rows; the merged stream is then paged
+        total, items = page(shards, risk_level, provider, patient_name, offset + limit, 0)
+        items = list(islice(items, offset, offset + limit))
     return DebtListResponse(items=items, total=total, limit=limit, offset=offset)
 
 
+def _merge_newest_first(pages: list[tuple[int, list]]) -> tuple[int, list]:
+    """Combine per-shard (total, newest-first rows) into one total and one newest-first list."""
+    total = sum(count for count, _ in pages)
+    if len(pages) == 1:
+        return total, pages[0][1]
+    merged = heapq.merge(*(rows for _, rows in pages), key=lambda d: d.created_at, reverse=True)
+    return total, list(merged)
+
+
+def _page_active(shards: ShardSessions, risk_level, provider, patient_name, limit: int, offset: int):
+    """Page over active debts, newest first."""
+    def page(db: Session):
+        query = db.query(MedicalDebt).filter(*_debt_filters(MedicalDebt, risk_level, provider, patient_name))
+        total = query.count()
+        items = query.order_by(MedicalDebt.created_at.desc()).offset(offset).limit(limit).all()
+        return total, items
+
+    return _merge_newest_first(shards.fan_out(page))
+
+
+def _page_with_archive(shards: ShardSessions, risk_level, provider, patient_name, limit: int, offset: int):
+    """Page over the hot table and the archive together (UNION ALL, newest first)."""
+    hot = select(
+        *[MedicalDebt.__table__.c[name] for name in DEBT_COLUMNS],
+        cast(null(), DateTime).label("archived_at"),
+    ).where(*_debt_filters(MedicalDebt, risk_level, provider, patient_name))
+    archived = select(
+        *[ArchivedDebt.__table__.c[name] for name in DEBT_COLUMNS],
+        ArchivedDebt.archived_at,
+    ).where(*_debt_filters(ArchivedDebt, risk_level, provider, patient_name))
+    combined = union_all(hot, archived).subquery()
+
+    def page(db: Session):
+        total = db.execute(select(func.count()).select_from(combined)).scalar()
+        rows = db.execute(
+            select(combined).order_by(combined.c.created_at.desc()).offset(offset).limit(limit)
+        ).mappings().all()
+        return total, [DebtResponse(**row) for row in rows]
+
+    return _merge_newest_first(shards.fan_out(page))
+
+
 @router.patch(
     "/{debt_id}",
     response_model=DebtResponse,
     summary="Update debt (partial)",
     responses={404: {"description": "Debt not found"}},
 )
-def update_debt(debt_id: int, payload: DebtUpdate, db: Session = Depends(get_db)):
-    """Partially update a debt record. Recomputes risk if financial fields change."""
+def update_debt(debt_id: int, payload: DebtUpdate, response: Response, shards: ShardSessions = Depends(get_shards)):
+    """Partially update a debt record. Recomputes risk if financial fields change. Archived debts are read-only."""
+    db = _shard_session(shards, debt_id)
     record = db.query(MedicalDebt).filter(MedicalDebt.id == debt_id).first()
     if not record:
         raise HTTPException(status_code=404, detail="Debt not found")
+    before = contribution(record)
     
     update_data = payload.model_dump(exclude_unset=True)
+    if "provider" in update_data and shard_map.for_provider(update_data["provider"]).id != shard_of_id(debt_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Provider belongs to another shard; delete and recreate the debt to move it",
+        )
     
     # Recompute risk/repayment if any financial or plan fields changed
     recompute_keys = ("income", "debt_amount", "credit_score", "interest_rate", "down_payment", "repayment_months")
@@ -145,12 +420,30 @@ def update_debt(debt_id: int, payload: DebtUpdate, db: Session = Depends(get_db)
         update_data["risk_level"] = result.risk_level
         update_data["recommended_monthly_payment"] = result.recommended_monthly_payment
         update_data["total_interest"] = result.total_interest
+
+    if any(k in update_data for k in ("patient_name", "provider", "debt_amount")):
+        fingerprint = debt_fingerprint(
+            update_data.get("patient_name", record.patient_name),
+            update_data.get("provider", record.provider),
+            update_data.get("debt_amount", record.debt_amount),
+        )
+        existing_id = find_existing(db, [fingerprint]).get(fingerprint)
+        if existing_id is not None and existing_id != record.id:
+            raise _duplicate_error(existing_id)
+        update_data["fingerprint"] = fingerprint
     
     for key, value in update_data.items():
         setattr(record, key, value)
+    record_debt_change(db, before, contribution(record))
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _duplicate_error(find_existing(db, [update_data["fingerprint"]]).get(update_data["fingerprint"]))
     db.refresh(record)
+    stick_to_primary(response)
+    publish_debt_change("debt.updated", record.id, _serialize(record))
     return record
 
 
@@ -160,12 +453,17 @@ def update_debt(debt_id: int, payload: DebtUpdate, db: Session = Depends(get_db)
     summary="Delete debt",
     responses={404: {"description": "Debt not found"}},
 )
-def delete_debt(debt_id: int, db: Session = Depends(get_db)):
-    """Delete a debt record. Idempotent: returns 204 even if already deleted."""
-    record = db.query(MedicalDebt).filter(MedicalDebt.id == debt_id).first()
+def delete_debt(debt_id: int, response: Response, shards: ShardSessions = Depends(get_shards)):
+    """Delete a debt record (active or archived). Idempotent: returns 204 even if already deleted."""
+    db = shards.for_id(debt_id)
+    record = _find_debt(db, debt_id) if db is not None else None
     if record:
+        if isinstance(record, MedicalDebt):
+            record_debt_change(db, contribution(record), None)
         db.delete(record)
         db.commit()
+        stick_to_primary(response)
+        publish_debt_change("debt.deleted", debt_id)
     return None
 
 
@@ -175,9 +473,9 @@ def delete_debt(debt_id: int, db: Session = Depends(get_db)):
     summary="Get debt summary",
     responses={404: {"description": "Debt not found"}},
 )
-def get_debt_summary(debt_id: int, db: Session = Depends(get_db)):
+def get_debt_summary(debt_id: int, shards: ShardSessions = Depends(get_read_shards)):
     """Get a concise summary with estimated payoff timeline."""
-    record = db.query(MedicalDebt).filter(MedicalDebt.id == debt_id).first()
+    record = _find_debt(_shard_session(shards, debt_id), debt_id)
     if not record:
         raise HTTPException(status_code=404, detail="Debt not found")
 
@@ -0,0 +1,13 @@
+"""
+Monitoring endpoint — admission-control counters in Prometheus text format.
+"""
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(tags=["monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Admission-control metrics")
+def metrics(request: Request):
+    """Rate-limit and concurrency counters for this worker process."""
+    return PlainTextResponse(request.app.state.rate_limiter.render_prometheus())
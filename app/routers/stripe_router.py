@@ -5,11 +5,10 @@ import os
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
 
 import stripe
 
-from app.database import get_db
+from app.database import ShardSessions, get_shards
 
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY", "")
 from app.models import MedicalDebt
@@ -30,7 +29,7 @@ class CreateCheckoutRequest(BaseModel):
 @router.post("/create-checkout-session")
 def create_checkout_session(
     payload: CreateCheckoutRequest,
-    db: Session = Depends(get_db),
+    shards: ShardSessions = Depends(get_shards),
 ):
     """
     Create a Stripe Checkout session for a debt payment.
@@ -43,7 +42,8 @@ def create_checkout_session(
             detail="Stripe is not configured. Set STRIPE_SECRET_KEY in environment.",
         )
 
-    record = db.query(MedicalDebt).filter(MedicalDebt.id == payload.debt_id).first()
+    db = shards.for_id(payload.debt_id)
+    record = db.query(MedicalDebt).filter(MedicalDebt.id == payload.debt_id).first() if db is not None else None
     if not record:
         raise HTTPException(status_code=404, detail="Debt not found")
 
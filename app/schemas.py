@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation.
 """
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from pydantic import BaseModel, Field, field_validator
 
@@ -43,6 +43,19 @@ class DebtUpdate(BaseModel):
     down_payment: Optional[float] = Field(None, ge=0)
     repayment_months: Optional[int] = Field(None, ge=1, le=120)
 
+    @field_validator("*", mode="before")
+    @classmethod
+    def not_null(cls, v):
+        # Omit a field to leave it unchanged; every column is NOT NULL
+        if v is None:
+            raise ValueError("May be omitted but not null")
+        return v
+
+    @field_validator("patient_name", "provider")
+    @classmethod
+    def strip_whitespace(cls, v: str) -> str:
+        return v.strip()
+
 
 # --- Response Schemas ---
 
@@ -63,6 +76,7 @@ class DebtResponse(BaseModel):
     total_interest: float
     created_at: datetime
     updated_at: datetime
+    archived_at: Optional[datetime] = None  # set when served from the archive
 
     model_config = {"from_attributes": True}
 
@@ -102,3 +116,42 @@ class DebtListResponse(BaseModel):
     total: int
     limit: int
     offset: int
+
+
+class BulkDuplicate(BaseModel):
+    """A skipped row of a bulk import."""
+    index: int = Field(..., description="Position in the submitted list")
+    existing_id: Optional[int] = Field(None, description="Stored debt it duplicates")
+    duplicate_of_index: Optional[int] = Field(None, description="Earlier row in the same batch it repeats")
+
+
+class BulkImportResponse(BaseModel):
+    """Result of POST /debts/bulk."""
+    created: list[int]
+    duplicates: list[BulkDuplicate]
+
+
+# --- Analytics Schemas ---
+
+class ProviderExposure(BaseModel):
+    """Outstanding exposure and risk concentration for one provider."""
+    provider: str
+    debt_count: int
+    total_outstanding: float
+    weighted_risk_score: float = Field(..., description="Risk score weighted by outstanding amount")
+    high_risk_share: float = Field(..., description="Share of outstanding amount in High-risk debts")
+
+
+class ProviderTrendPoint(BaseModel):
+    """Provider exposure at the end of one day."""
+    day: date
+    debt_count: int
+    total_outstanding: float
+    weighted_risk_score: float
+    high_risk_share: float
+
+
+class ProviderTrendResponse(BaseModel):
+    """Daily exposure series for a provider."""
+    provider: str
+    points: list[ProviderTrendPoint]
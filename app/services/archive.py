@@ -0,0 +1,147 @@
+"""
+Archival tier: moves debts whose repayment plan has ended out of the hot
+`medical_debts` table into `medical_debts_archive`, keeping list queries and
+counts proportional to active debts.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.models import DEBT_COLUMNS, ArchivedDebt, MedicalDebt
+from app.services.events import publish_debt_change
+from app.services.rollups import contribution, record_debt_changes
+
+logger = logging.getLogger(__name__)
+
+AVG_DAYS_PER_MONTH = 30.44
+# pg_try_advisory_lock key: with several workers only one archives at a time
+_PG_LOCK_KEY = 726_314_002
+
+try:
+    import fcntl
+except ImportError:  # Windows: no gunicorn workers to coordinate
+    fcntl = None
+
+
+def plan_end(debt) -> datetime:
+    """When the repayment plan finishes, counted from creation."""
+    return debt.created_at + timedelta(days=debt.repayment_months * AVG_DAYS_PER_MONTH)
+
+
+def archive_debts(
+    db: Session,
+    grace_days: int = 90,
+    batch_size: int = 500,
+    now: datetime | None = None,
+) -> int:
+    """
+    Archive debts whose plan ended and that have not been updated for `grace_days`.
+
+    Each batch is copied and deleted in one transaction; ids are preserved (the hot
+    table never reuses ids, see migration 4). Returns the number of debts archived.
+    """
+    now = now or datetime.utcnow()
+    idle_before = now - timedelta(days=grace_days)
+    archived = 0
+    last_id = 0
+    while True:
+        # Cheap SQL pre-filter; the plan-end check needs per-row date math done below
+        candidates = db.execute(
+            select(
+                MedicalDebt.id,
+                MedicalDebt.created_at,
+                MedicalDebt.repayment_months,
+                # for the rollup delta
+                MedicalDebt.provider,
+                MedicalDebt.risk_level,
+                MedicalDebt.risk_score,
+                MedicalDebt.debt_amount,
+                MedicalDebt.down_payment,
+            )
+            .where(
+                MedicalDebt.id > last_id,
+                MedicalDebt.updated_at < idle_before,
+            )
+            .order_by(MedicalDebt.id)
+            .limit(batch_size)
+        ).all()
+        if not candidates:
+            break
+        last_id = candidates[-1].id
+        ended = [row for row in candidates if plan_end(row) <= now]
+        if not ended:
+            continue
+        ids = [row.id for row in ended]
+        db.execute(
+            insert(ArchivedDebt).from_select(
+                DEBT_COLUMNS,
+                select(*[MedicalDebt.__table__.c[name] for name in DEBT_COLUMNS]).where(MedicalDebt.id.in_(ids)),
+            )
+        )
+        db.execute(delete(MedicalDebt).where(MedicalDebt.id.in_(ids)))
+        record_debt_changes(db, [(contribution(row), None) for row in ended], day=now.date())
+        db.commit()
+        for debt_id in ids:
+            publish_debt_change("debt.archived", debt_id)
+        archived += len(ids)
+    return archived
+
+
+@contextmanager
+def archive_lock(engine):
+    """
+    Yield True if this process may archive now, False if another one is. Postgres uses
+    an advisory lock; SQLite an exclusive flock on a file next to the database, so
+    only one gunicorn worker (or the CLI) archives a given database at a time.
+    """
+    if engine.dialect.name == "postgresql":
+        # Session-level lock on a dedicated connection, so the per-batch commits don't release it
+        with engine.connect() as lock_conn:
+            if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _PG_LOCK_KEY}).scalar():
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+        return
+    path = engine.url.database
+    if fcntl is None or not path or path == ":memory:":
+        yield True
+        return
+    with open(f"{path}.archive-lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+async def archive_periodically(session_factories, interval_seconds: int, grace_days: int) -> None:
+    """Background loop started from the app lifespan; runs archive_debts on each shard off the event loop."""
+
+    def run_shard(session_factory) -> int:
+        db = session_factory()
+        try:
+            with archive_lock(db.get_bind()) as acquired:
+                return archive_debts(db, grace_days=grace_days) if acquired else 0
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        for session_factory in session_factories:
+            try:
+                count = await asyncio.to_thread(run_shard, session_factory)
+                if count:
+                    logger.info("Archived %d debts", count)
+            except Exception:
+                logger.exception("Debt archival failed")
@@ -0,0 +1,39 @@
+"""
+Duplicate detection for debt records.
+
+A debt's fingerprint is a hash of its normalized (patient_name, provider,
+debt_amount). medical_debts has a unique index on it, so resubmissions are
+caught by one index probe, and races between identical requests by the index.
+"""
+import hashlib
+import re
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import MedicalDebt
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.strip()).casefold()
+
+
+def debt_fingerprint(patient_name: str, provider: str, debt_amount: float) -> str:
+    """Stable hex fingerprint; case, spacing and sub-cent differences are ignored."""
+    key = f"{_normalize(patient_name)}\x1f{_normalize(provider)}\x1f{round(debt_amount * 100)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def find_existing(db: Session, fingerprints: list[str], chunk_size: int = 500) -> dict[str, int]:
+    """Map each already-stored fingerprint to its debt id, probing the index in chunks."""
+    found: dict[str, int] = {}
+    unique = list(dict.fromkeys(fingerprints))
+    for i in range(0, len(unique), chunk_size):
+        chunk = unique[i:i + chunk_size]
+        rows = db.execute(
+            select(MedicalDebt.fingerprint, MedicalDebt.id).where(MedicalDebt.fingerprint.in_(chunk))
+        )
+        found.update((fingerprint, debt_id) for fingerprint, debt_id in rows)
+    return found
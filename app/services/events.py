@@ -0,0 +1,257 @@
+"""
+Pub/sub for debt change events, consumed by the SSE feed.
+
+The default bus is in-process: events carry ids of the form "<boot>-<seq>". With
+EVENTS_REDIS_URL set, events go through a Redis stream instead, so every worker
+sees every change and ids are the stream's entry ids. Either way a bounded
+history lets clients resume with Last-Event-ID; when the id is unknown or has
+fallen out of history, the client is told to reload instead.
+"""
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+from app.database import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DebtEvent:
+    """One change to a debt record."""
+    id: str
+    seq: int | tuple[int, int]  # ordering key: local counter, or Redis stream id
+    type: str  # debt.created | debt.updated | debt.deleted | debt.archived
+    data: dict
+
+
+# Queue item telling a subscriber to finish: the server is shutting down
+CLOSED = object()
+
+
+class EventBus:
+    """Thread-safe publisher (sync routes run in a threadpool) with asyncio subscribers."""
+
+    def __init__(self, history_size: int = 1000, subscriber_queue_size: int = 256) -> None:
+        self._history: deque[DebtEvent] = deque(maxlen=history_size)
+        self._queue_size = subscriber_queue_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Start a new id space with empty history. Called in each gunicorn worker after
+        fork: ids issued by the master or a sibling worker must not resume here.
+        """
+        self.boot_id = f"{os.getpid():x}{uuid.uuid4().hex[:6]}"
+        self._seq = itertools.count(1)
+        self._history.clear()
+        self._subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self.closed = False
+
+    def publish(self, event_type: str, data: dict) -> DebtEvent | None:
+        """Record an event and fan it out to every live subscriber."""
+        with self._lock:
+            seq = next(self._seq)
+        event = DebtEvent(id=f"{self.boot_id}-{seq}", seq=seq, type=event_type, data=data)
+        self._fan_out(event)
+        return event
+
+    async def run(self) -> None:
+        """Background work for the life of the process (started from the lifespan); none here."""
+
+    def _fan_out(self, event: DebtEvent | None) -> None:
+        """Add `event` to history and queue it for every subscriber; `None` tells them to reload."""
+        with self._lock:
+            if event is not None:
+                self._history.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, event)
+
+    def close(self) -> None:
+        """Tell every subscriber to finish; subscribers arriving later finish at once."""
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, CLOSED)
+            except RuntimeError:
+                pass  # that loop has already stopped
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: DebtEvent | object) -> None:
+        if queue.full():
+            # Slow consumer: drop its backlog and tell it to reload (or to finish)
+            while not queue.empty():
+                queue.get_nowait()
+            if event is not CLOSED:
+                event = None
+        queue.put_nowait(event)
+
+    def subscribe(self, last_event_id: str | None = None) -> tuple[asyncio.Queue, list[DebtEvent] | None]:
+        """
+        Register a subscriber on the running loop. Returns its queue and the events to
+        replay after `last_event_id`, or None if the gap cannot be replayed.
+        A `None` item on the queue means the subscriber fell behind and must reload;
+        `CLOSED` means it must finish.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+            replay = self._replay_after(last_event_id) if last_event_id else []
+            if self.closed:
+                queue.put_nowait(CLOSED)
+        return queue, replay
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = {s for s in self._subscribers if s[1] is not queue}
+
+    def _replay_after(self, last_event_id: str) -> list[DebtEvent] | None:
+        boot_id, _, seq = last_event_id.partition("-")
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if self._history and seq < self._history[0].seq - 1:
+            return None
+        return [e for e in self._history if e.seq > seq]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def _stream_seq(entry_id: str) -> tuple[int, int] | None:
+    """Redis stream ids are "<ms>-<n>"; compare them as integer pairs."""
+    ms, _, n = entry_id.partition("-")
+    if not (ms.isdigit() and n.isdigit()):
+        return None
+    return int(ms), int(n)
+
+
+class RedisEventBus(EventBus):
+    """
+    Change feed shared by every worker through a Redis stream (requires `pip install redis`).
+    Publishing appends to the stream; each worker tails it and fans entries out to its own
+    subscribers, so clients see changes made through any worker and can resume anywhere.
+    While Redis is unreachable, subscribers of the publishing worker are told to reload.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        stream: str = "medipay:debt-events",
+        history_size: int = 1000,
+        subscriber_queue_size: int = 256,
+        log_every: float = 60.0,
+    ) -> None:
+        import redis  # optional dependency
+
+        # Sync client: changes are published from threadpool routes and the archiver thread
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._url = url
+        self._stream = stream
+        self._log_every = log_every
+        self._last_error_log = 0.0
+        super().__init__(history_size, subscriber_queue_size)
+
+    def publish(self, event_type: str, data: dict) -> None:
+        try:
+            self._client.xadd(
+                self._stream,
+                {"type": event_type, "data": json.dumps(data)},
+                maxlen=self._history.maxlen,
+                approximate=True,
+            )
+        except Exception:
+            self._log_error("Redis change feed unavailable; local streams will reload")
+            self._fan_out(None)
+
+    async def run(self) -> None:
+        """Tail the stream until cancelled, reconnecting after errors without losing entries."""
+        client = self._async_client()
+        last_id = None
+        try:
+            while True:
+                try:
+                    if last_id is None:
+                        # Seed history so clients can resume against a freshly started worker
+                        entries = await client.xrevrange(self._stream, count=self._history.maxlen)
+                        with self._lock:
+                            self._history.extend(self._event(*entry) for entry in reversed(entries))
+                        last_id = entries[0][0] if entries else "0-0"
+                    response = await client.xread({self._stream: last_id}, count=100, block=5000)
+                    for _, entries in response or []:
+                        for entry in entries:
+                            last_id = entry[0]
+                            self._fan_out(self._event(*entry))
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self._log_error("Redis change feed unavailable; retrying")
+                    await asyncio.sleep(1)
+        finally:
+            await client.aclose()
+
+    def _async_client(self):
+        import redis.asyncio as aioredis
+
+        return aioredis.from_url(self._url, decode_responses=True)
+
+    def _event(self, entry_id: str, fields: dict) -> DebtEvent:
+        return DebtEvent(id=entry_id, seq=_stream_seq(entry_id), type=fields["type"], data=json.loads(fields["data"]))
+
+    def _replay_after(self, last_event_id: str) -> list[DebtEvent] | None:
+        seq = _stream_seq(last_event_id)
+        # Replay only when the client has seen our oldest entry, i.e. nothing in between is missing
+        if seq is None or not self._history or seq < self._history[0].seq:
+            return None
+        return [e for e in self._history if e.seq > seq]
+
+    def _log_error(self, message: str) -> None:
+        now = time.monotonic()
+        if now - self._last_error_log >= self._log_every:
+            self._last_error_log = now
+            logger.exception(message)
+
+
+debt_events = RedisEventBus(settings.events_redis_url) if settings.events_redis_url else EventBus()
+
+
+def close_on_server_shutdown(bus: EventBus) -> None:
+    """
+    uvicorn waits for open connections to finish *before* it runs the lifespan
+    shutdown, so an SSE stream would hold every shutdown (SIGTERM, or a gunicorn
+    worker recycled after max_requests) for the full graceful timeout. Close the
+    bus as soon as uvicorn starts shutting down instead. No-op under other servers.
+    """
+    try:
+        from uvicorn.server import Server
+    except ImportError:
+        return
+    shutdown = Server.shutdown
+    if getattr(shutdown, "closes_event_bus", False):
+        return
+
+    @functools.wraps(shutdown)
+    async def closing_shutdown(self, *args, **kwargs):
+        bus.close()
+        await shutdown(self, *args, **kwargs)
+
+    closing_shutdown.closes_event_bus = True
+    Server.shutdown = closing_shutdown
+
+
+def publish_debt_change(event_type: str, debt_id: int, debt: dict | None = None) -> None:
+    """Publish a debt change; `debt` is the full serialized record for creates/updates."""
+    debt_events.publish(event_type, {"id": debt_id, "debt": debt, "ts": time.time()})
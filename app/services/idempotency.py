@@ -0,0 +1,61 @@
+"""
+Bounded in-memory cache of responses for requests sent with an Idempotency-Key.
+
+A retried request with the same key and payload gets the original response
+replayed. Entries expire after `ttl_seconds`; the oldest are evicted beyond
+`max_entries`. The cache is per process — the fingerprint index still prevents
+duplicate rows when retries land on another worker.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+class IdempotencyKeyReused(ValueError):
+    """Same Idempotency-Key sent with a different request body."""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status_code: int
+    body: dict
+    payload_hash: str
+    stored_at: float
+
+
+def payload_hash(payload: dict) -> str:
+    return hashlib.sha256(repr(sorted(payload.items())).encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: int = 24 * 3600) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, request_hash: str) -> CachedResponse | None:
+        """Cached response for `key`, or None. Raises IdempotencyKeyReused on a payload mismatch."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if entry.payload_hash != request_hash:
+            raise IdempotencyKeyReused("Idempotency-Key was already used with a different request body")
+        return entry
+
+    def put(self, key: str, request_hash: str, status_code: int, body: dict) -> None:
+        with self._lock:
+            self._entries[key] = CachedResponse(status_code, body, request_hash, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+debt_creation_keys = IdempotencyCache()
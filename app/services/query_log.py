@@ -0,0 +1,173 @@
+"""
+Slow-query log: times every statement on the instrumented engines and, for
+those over the threshold, aggregates by normalized statement shape together
+with the database's query plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on
+PostgreSQL). Parameter values are never stored.
+"""
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\([^)]+\)s|%s|\?|:\w+|\$\d+")
+# Expanded IN lists vary in length per call; collapse them to one shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+# Plan rows that read a whole table rather than an index range
+_SQLITE_FULL_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\w+)\b(?! USING (?:COVERING )?INDEX)")
+_PG_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement shape: literals and placeholders replaced, whitespace collapsed."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryShape:
+    """Aggregated timings for one statement shape."""
+    shape: str
+    engine: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_seen: float = 0.0
+    plan: list[str] = field(default_factory=list)
+    full_scans: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "shape": self.shape,
+            "engine": self.engine,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_seen": self.last_seen,
+            "plan": self.plan,
+            "full_scans": self.full_scans,
+        }
+
+
+class SlowQueryLog:
+    """
+    Statements slower than `threshold_ms` (negative disables the log) are grouped
+    by shape; at most `max_shapes` are kept, least recently seen evicted first.
+    """
+
+    def __init__(self, threshold_ms: float = 100.0, max_shapes: int = 200) -> None:
+        self.threshold_ms = threshold_ms
+        self.max_shapes = max_shapes
+        self._shapes: dict[tuple[str, str], QueryShape] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms >= 0
+
+    def install(self, engine: Engine, name: str) -> None:
+        """Attach timing hooks to `engine`; `name` labels its entries (e.g. primary, replica)."""
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _finish(conn, cursor, statement, parameters, context, executemany):
+            elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self.record(name, engine.dialect.name, cursor, statement, parameters, executemany, elapsed_ms)
+
+    def install_shards(self, shards) -> None:
+        """Instrument every shard's primary and replica; names gain a :<shard id> suffix when sharded."""
+        for shard in shards:
+            suffix = f":{shard.id}" if len(shards) > 1 else ""
+            self.install(shard.engine, "primary" + suffix)
+            if shard.read_engine is not shard.engine:
+                self.install(shard.read_engine, "replica" + suffix)
+
+    def record(self, engine_name, dialect, cursor, statement, parameters, executemany, elapsed_ms) -> None:
+        shape = normalize_statement(statement)
+        key = (engine_name, shape)
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                entry = self._shapes[key] = QueryShape(shape=shape, engine=engine_name)
+                if len(self._shapes) > self.max_shapes:
+                    oldest = min(self._shapes, key=lambda k: self._shapes[k].last_seen)
+                    del self._shapes[oldest]
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.last_seen = time.time()
+            needs_plan = not entry.plan
+        # The plan is captured once per shape, outside the lock
+        if needs_plan and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            plan = explain(dialect, cursor, statement, parameters)
+            with self._lock:
+                entry.plan = plan
+                entry.full_scans = full_scans(dialect, plan)
+
+    def report(self) -> list[dict]:
+        """Shapes ordered by total time spent, highest first."""
+        with self._lock:
+            entries = [e.as_dict() for e in self._shapes.values()]
+        return sorted(entries, key=lambda e: e["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+
+
+def explain(dialect: str, cursor, statement: str, parameters) -> list[str]:
+    """
+    Plan lines for a statement, via a raw DB-API cursor so no engine events fire.
+    On PostgreSQL the probe runs inside a savepoint: a failed EXPLAIN would otherwise
+    abort the request's transaction.
+    """
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    dbapi_conn = cursor.connection
+    savepoint = dialect == "postgresql" and not getattr(dbapi_conn, "autocommit", False)
+    raw = dbapi_conn.cursor()
+    try:
+        if savepoint:
+            raw.execute("SAVEPOINT medipay_explain")
+        raw.execute(prefix + statement, parameters or ())
+        rows = raw.fetchall()
+        if savepoint:
+            raw.execute("RELEASE SAVEPOINT medipay_explain")
+    except Exception as exc:  # plan capture must never break the request
+        if savepoint:
+            try:
+                raw.execute("ROLLBACK TO SAVEPOINT medipay_explain")
+            except Exception:
+                pass
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        raw.close()
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return [str(row[-1]) for row in rows]
+    return [str(row[0]) for row in rows]
+
+
+def full_scans(dialect: str, plan: list[str]) -> list[str]:
+    """Tables the plan reads in full."""
+    pattern = _SQLITE_FULL_SCAN if dialect == "sqlite" else _PG_FULL_SCAN
+    tables = []
+    for line in plan:
+        for match in pattern.finditer(line):
+            if match.group(1) not in tables:
+                tables.append(match.group(1))
+    return tables
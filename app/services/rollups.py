@@ -0,0 +1,267 @@
+"""
+Provider risk-concentration rollups, maintained incrementally from debt writes.
+
+Each create/update/delete/archive adds a signed delta to the (day, provider,
+risk_level) bucket in the same transaction as the debt change. Dashboards read
+a few rows per provider per day instead of aggregating medical_debts. Providers
+are bucketed by tenant_key, so spellings that differ only in case or spacing add
+up to one provider; a spelling is kept for display.
+"""
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.database import tenant_key
+from app.models import ArchivedDebt, MedicalDebt, ProviderRiskDaily
+
+RISK_LEVELS = ("Low", "Medium", "High")
+
+
+@dataclass(frozen=True)
+class Contribution:
+    """What one debt adds to its provider's exposure."""
+    provider: str
+    risk_level: str
+    outstanding: float
+    risk_score: float
+
+
+def contribution(debt) -> Contribution:
+    outstanding = max(0.0, debt.debt_amount - debt.down_payment)
+    return Contribution(debt.provider, debt.risk_level, outstanding, debt.risk_score)
+
+
+def _apply(db: Session, day: date, provider_key: str, risk_level: str, name: str, delta: list[float]) -> None:
+    count, outstanding, weighted = delta
+    values = {
+        "day": day,
+        "provider": provider_key,
+        "provider_name": name,
+        "risk_level": risk_level,
+        "debt_count": count,
+        "total_outstanding": outstanding,
+        "weighted_risk_sum": weighted,
+    }
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(ProviderRiskDaily).values(**values)
+    table = ProviderRiskDaily.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "provider", "risk_level"],
+        set_={
+            "provider_name": stmt.excluded.provider_name,
+            "debt_count": table.c.debt_count + stmt.excluded.debt_count,
+            "total_outstanding": table.c.total_outstanding + stmt.excluded.total_outstanding,
+            "weighted_risk_sum": table.c.weighted_risk_sum + stmt.excluded.weighted_risk_sum,
+        },
+    )
+    db.execute(stmt)
+
+
+def record_debt_changes(
+    db: Session,
+    changes: Iterable[tuple[Contribution | None, Contribution | None]],
+    day: date | None = None,
+) -> None:
+    """
+    Add many (before, after) changes to the rollups. Deltas are summed per
+    (provider, risk_level) bucket first, so a batch costs one upsert per bucket.
+    Call before committing the debt writes.
+    """
+    buckets: dict[tuple[str, str], list[float]] = {}
+    names: dict[tuple[str, str], str] = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for c, sign in ((before, -1), (after, +1)):
+            if c is None:
+                continue
+            bucket = (tenant_key(c.provider), c.risk_level)
+            names[bucket] = c.provider  # the new spelling wins on a rename
+            delta = buckets.setdefault(bucket, [0, 0.0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * c.outstanding
+            delta[2] += sign * c.risk_score * c.outstanding
+    day = day or datetime.utcnow().date()
+    for (provider_key, risk_level), delta in buckets.items():
+        _apply(db, day, provider_key, risk_level, names[provider_key, risk_level], delta)
+
+
+def record_debt_change(
+    db: Session,
+    before: Contribution | None,
+    after: Contribution | None,
+    day: date | None = None,
+) -> None:
+    """Add the change from `before` to `after` to the rollups. Call before committing the debt write."""
+    record_debt_changes(db, [(before, after)], day=day)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Recompute all rollups from current data: active debts count from their creation day,
+    archived debts from creation until their archive day. History of deleted debts and of
+    past edits is not recoverable, so this reflects current values. Returns buckets written.
+    """
+    db.execute(delete(ProviderRiskDaily))
+
+    def grouped(model, day_column, sign: int):
+        outstanding = model.debt_amount - model.down_payment
+        day = func.date(day_column)
+        rows = db.execute(
+            select(
+                day.label("day"),
+                model.provider,
+                model.risk_level,
+                func.count().label("n"),
+                func.sum(outstanding).label("outstanding"),
+                func.sum(model.risk_score * outstanding).label("weighted"),
+            ).group_by(day, model.provider, model.risk_level)
+        ).all()
+        return [(r, sign) for r in rows]
+
+    buckets: dict[tuple, list] = {}
+    for row, sign in (
+        grouped(MedicalDebt, MedicalDebt.created_at, +1)
+        + grouped(ArchivedDebt, ArchivedDebt.created_at, +1)
+        + grouped(ArchivedDebt, ArchivedDebt.archived_at, -1)
+    ):
+        day = row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day))
+        totals = buckets.setdefault((day, tenant_key(row.provider), row.risk_level), [row.provider, 0, 0.0, 0.0])
+        totals[1] += sign * row.n
+        totals[2] += sign * (row.outstanding or 0.0)
+        totals[3] += sign * (row.weighted or 0.0)
+
+    db.add_all(
+        ProviderRiskDaily(
+            day=day, provider=provider_key, provider_name=name, risk_level=risk_level,
+            debt_count=n, total_outstanding=amount, weighted_risk_sum=weighted,
+        )
+        for (day, provider_key, risk_level), (name, n, amount, weighted) in buckets.items()
+    )
+    db.commit()
+    return len(buckets)
+
+
+# --- Reads ---
+#
+# Readers return raw per-risk-level totals [count, outstanding, weighted] so results
+# from several shards can be summed before ratios are computed.
+
+Totals = dict[str, list[float]]  # risk_level -> [debt_count, total_outstanding, weighted_risk_sum]
+ProviderTotals = tuple[str, Totals]  # (display name, totals)
+
+
+def _merge_totals(parts: list[Totals]) -> Totals:
+    merged: Totals = {}
+    for part in parts:
+        for level, values in part.items():
+            totals = merged.setdefault(level, [0, 0.0, 0.0])
+            for i, value in enumerate(values):
+                totals[i] += value
+    return merged
+
+
+def _summarize(by_level: Totals) -> dict:
+    count = sum(v[0] for v in by_level.values())
+    total = sum(v[1] for v in by_level.values())
+    weighted = sum(v[2] for v in by_level.values())
+    high = by_level.get("High", [0, 0.0, 0.0])[1]
+    return {
+        "debt_count": int(count),
+        "total_outstanding": round(total, 2),
+        "weighted_risk_score": round(weighted / total, 4) if total > 0 else 0.0,
+        "high_risk_share": round(high / total, 4) if total > 0 else 0.0,
+    }
+
+
+def provider_exposure_totals(db: Session, as_of: date | None = None) -> dict[str, ProviderTotals]:
+    """Current (or as-of) totals per provider key and risk level, with a display name."""
+    query = select(
+        ProviderRiskDaily.provider,
+        ProviderRiskDaily.risk_level,
+        func.max(ProviderRiskDaily.provider_name),
+        func.sum(ProviderRiskDaily.debt_count),
+        func.sum(ProviderRiskDaily.total_outstanding),
+        func.sum(ProviderRiskDaily.weighted_risk_sum),
+    ).group_by(ProviderRiskDaily.provider, ProviderRiskDaily.risk_level)
+    if as_of is not None:
+        query = query.where(ProviderRiskDaily.day <= as_of)
+
+    providers: dict[str, ProviderTotals] = {}
+    for provider_key, level, name, n, amount, weighted in db.execute(query):
+        _, levels = providers.setdefault(provider_key, (name or provider_key, {}))
+        levels[level] = [n or 0, amount or 0.0, weighted or 0.0]
+    return providers
+
+
+def rank_exposure(per_shard: list[dict[str, ProviderTotals]]) -> list[dict]:
+    """Merge per-shard totals by provider (a re-sharded provider has rows on several), largest first."""
+    names: dict[str, str] = {}
+    providers: dict[str, list[Totals]] = {}
+    for totals in per_shard:
+        for provider_key, (name, levels) in totals.items():
+            names.setdefault(provider_key, name)
+            providers.setdefault(provider_key, []).append(levels)
+    results = [{"provider": names[key], **_summarize(_merge_totals(parts))} for key, parts in providers.items()]
+    results = [r for r in results if r["debt_count"] > 0]
+    return sorted(results, key=lambda r: r["total_outstanding"], reverse=True)
+
+
+def provider_exposure(db: Session, as_of: date | None = None) -> list[dict]:
+    """Current (or as-of) exposure for every provider, largest first."""
+    return rank_exposure([provider_exposure_totals(db, as_of)])
+
+
+def provider_trend_totals(db: Session, provider: str, start: date, end: date) -> list[Totals]:
+    """Running totals at the end of each day from `start` to `end` inclusive, for any spelling of `provider`."""
+    provider = tenant_key(provider)
+    baseline_rows = db.execute(
+        select(
+            ProviderRiskDaily.risk_level,
+            func.sum(ProviderRiskDaily.debt_count),
+            func.sum(ProviderRiskDaily.total_outstanding),
+            func.sum(ProviderRiskDaily.weighted_risk_sum),
+        )
+        .where(ProviderRiskDaily.provider == provider, ProviderRiskDaily.day < start)
+        .group_by(ProviderRiskDaily.risk_level)
+    ).all()
+    running = {level: [0, 0.0, 0.0] for level in RISK_LEVELS}
+    for level, n, amount, weighted in baseline_rows:
+        running[level] = [n or 0, amount or 0.0, weighted or 0.0]
+
+    deltas: dict[date, list] = {}
+    for row in db.execute(
+        select(ProviderRiskDaily)
+        .where(ProviderRiskDaily.provider == provider, ProviderRiskDaily.day.between(start, end))
+    ).scalars():
+        deltas.setdefault(row.day, []).append(row)
+
+    days = []
+    day = start
+    while day <= end:
+        for row in deltas.get(day, []):
+            totals = running.setdefault(row.risk_level, [0, 0.0, 0.0])
+            totals[0] += row.debt_count
+            totals[1] += row.total_outstanding
+            totals[2] += row.weighted_risk_sum
+        days.append({level: list(values) for level, values in running.items()})
+        day += timedelta(days=1)
+    return days
+
+
+def trend_points(per_shard: list[list[Totals]], start: date) -> list[dict]:
+    """One exposure point per day, summing the shards' running totals."""
+    return [
+        {"day": start + timedelta(days=offset), **_summarize(_merge_totals(list(parts)))}
+        for offset, parts in enumerate(zip(*per_shard))
+    ]
+
+
+def provider_trend(db: Session, provider: str, start: date, end: date) -> list[dict]:
+    """Daily exposure points for one provider from `start` to `end` inclusive."""
+    return trend_points([provider_trend_totals(db, provider, start, end)], start)
@@ -7,8 +7,8 @@ const API_BASE = import.meta.env.DEV ? '/api' : (import.meta.env.VITE_API_URL ||
 async function request(path, options = {}) {
   const url = `${API_BASE}${path}`;
   const res = await fetch(url, {
-    headers: { 'Content-Type': 'application/json', ...options.headers },
     ...options,
+    headers: { 'Content-Type': 'application/json', ...options.headers },
   });
   if (!res.ok) {
     const err = await res.json().catch(() => ({ detail: res.statusText }));
@@ -21,8 +21,27 @@ async function request(path, options = {}) {
   return res.json();
 }
 
+/**
+ * Subscribe to the debt change feed (Server-Sent Events).
+ * handlers: { onChange(type, data), onReset() }. Returns an unsubscribe function.
+ * EventSource reconnects on its own and resumes via Last-Event-ID.
+ */
+function subscribeDebtEvents({ onChange, onReset }) {
+  const source = new EventSource(`${API_BASE}/debts/events`);
+  for (const type of ['debt.created', 'debt.updated', 'debt.deleted', 'debt.archived']) {
+    source.addEventListener(type, (e) => onChange(type, JSON.parse(e.data)));
+  }
+  source.addEventListener('reset', () => onReset?.());
+  return () => source.close();
+}
+
 export const api = {
-  createDebt: (data) => request('/debts', { method: 'POST', body: JSON.stringify(data) }),
+  createDebt: (data, idempotencyKey) =>
+    request('/debts', {
+      method: 'POST',
+      body: JSON.stringify(data),
+      ...(idempotencyKey && { headers: { 'Idempotency-Key': idempotencyKey } }),
+    }),
   getDebts: (params = {}) => {
     const q = new URLSearchParams(params).toString();
     return request(`/debts${q ? `?${q}` : ''}`);
@@ -31,6 +50,7 @@ export const api = {
   getDebtSummary: (id) => request(`/debts/${id}/summary`),
   updateDebt: (id, data) => request(`/debts/${id}`, { method: 'PATCH', body: JSON.stringify(data) }),
   deleteDebt: (id) => request(`/debts/${id}`, { method: 'DELETE' }),
+  subscribeDebtEvents,
   createCheckoutSession: (debtId, successUrl, cancelUrl, amount, paymentType) =>
     request('/stripe/create-checkout-session', {
       method: 'POST',
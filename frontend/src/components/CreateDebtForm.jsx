@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { api } from '../api';
 import './CreateDebtForm.css';
 
@@ -16,12 +16,14 @@ export function CreateDebtForm({ onCreated }) {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [result, setResult] = useState(null);
-
+  // Same key for resubmits of an unchanged form, so retries can't create duplicates
+  const idempotencyKey = useRef(crypto.randomUUID());
 
   const handleChange = (e) => {
     const { name, value } = e.target;
     setForm((prev) => ({ ...prev, [name]: value }));
     setError(null);
+    idempotencyKey.current = crypto.randomUUID();
   };
 
   const handleSubmit = async (e) => {
@@ -40,7 +42,8 @@ export function CreateDebtForm({ onCreated }) {
         down_payment: form.down_payment ? parseFloat(form.down_payment) : 0,
         repayment_months: form.repayment_months ? parseInt(form.repayment_months, 10) : 24,
       };
-      const res = await api.createDebt(data);
+      const res = await api.createDebt(data, idempotencyKey.current);
+      idempotencyKey.current = crypto.randomUUID();
       setResult(res);
       setForm({ patient_name: '', income: '', debt_amount: '', credit_score: '', provider: '', interest_rate: '', down_payment: '', repayment_months: '24' });
       onCreated?.(res);
@@ -1,8 +1,17 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { api } from '../api';
 import { DebtCard } from './DebtCard';
 import './DebtList.css';
 
+function matchesFilters(debt, filters) {
+  const contains = (value, term) => !term || value.toLowerCase().includes(term.toLowerCase());
+  return (
+    (!filters.risk_level || debt.risk_level === filters.risk_level) &&
+    contains(debt.provider, filters.provider) &&
+    contains(debt.patient_name, filters.patient_name)
+  );
+}
+
 export function DebtList({ refreshTrigger }) {
   const [debts, setDebts] = useState([]);
   const [total, setTotal] = useState(0);
@@ -40,6 +49,45 @@ export function DebtList({ refreshTrigger }) {
     fetchDebts();
   }, [fetchDebts, refreshTrigger]);
 
+  // Live updates from the change feed instead of re-fetching the list
+  const filtersRef = useRef(filters);
+  const fetchRef = useRef(fetchDebts);
+  const debtsRef = useRef(debts);
+  useEffect(() => {
+    filtersRef.current = filters;
+    fetchRef.current = fetchDebts;
+    debtsRef.current = debts;
+  }, [filters, fetchDebts, debts]);
+
+  useEffect(() => {
+    const isShown = (id) => debtsRef.current.some((d) => d.id === id);
+    const removeDebt = (id) => {
+      if (!isShown(id)) return;
+      setDebts((prev) => prev.filter((d) => d.id !== id));
+      setTotal((t) => Math.max(0, t - 1));
+    };
+
+    return api.subscribeDebtEvents({
+      onChange: (type, { id, debt }) => {
+        const current = filtersRef.current;
+        if (type === 'debt.created') {
+          if (current.offset !== 0 || !matchesFilters(debt, current) || isShown(id)) return;
+          setDebts((prev) => [debt, ...prev].slice(0, current.limit));
+          setTotal((t) => t + 1);
+        } else if (type === 'debt.updated') {
+          if (!matchesFilters(debt, current)) {
+            removeDebt(id);
+            return;
+          }
+          setDebts((prev) => prev.map((d) => (d.id === id ? debt : d)));
+        } else {
+          removeDebt(id);
+        }
+      },
+      onReset: () => fetchRef.current(),
+    });
+  }, []);
+
   const handleFilterChange = (key, value) => {
     setFilters((prev) => ({ ...prev, [key]: value, offset: 0 }));
   };
@@ -0,0 +1,61 @@
+"""
+Production launcher: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app      (or ./run.sh prod)
+
+The app is imported once in the master (preload_app) so workers share its
+memory copy-on-write; each worker then drops the inherited DB pool and opens
+its own connections. Migrations run once in the master before any worker forks.
+"""
+import multiprocessing
+import os
+
+try:
+    import uvicorn_worker  # noqa: F401 — maintained home of the worker class
+
+    worker_class = "uvicorn_worker.UvicornWorker"
+except ImportError:
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+# One worker per core: requests are CPU-bound in Python and each worker has its own event loop
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+preload_app = True
+if workers > 1 and not os.getenv("EVENTS_REDIS_URL"):
+    # Without a shared feed each worker only sees its own changes; make SSE clients
+    # reload periodically instead (read by app Settings)
+    os.environ.setdefault("EVENT_RESYNC_SECONDS", "30")
+
+# Graceful drain: on SIGTERM, workers stop accepting and finish in-flight requests
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+# Recycle workers periodically (jittered so they don't all restart together)
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+
+
+def on_starting(server):
+    """Master, before forking: migrate once so workers start on the fast path."""
+    from app.database import dispose_engines, settings, shard_map
+    from app.migrations import migrate_shards
+
+    if settings.run_migrations_on_startup:
+        for shard_id, versions in migrate_shards(shard_map).items():
+            for version in versions:
+                server.log.info("Applied migration %04d on shard %d", version, shard_id)
+    dispose_engines(close=True)
+
+
+def post_fork(server, worker):
+    """Worker, right after fork: never reuse connections, HTTP clients or event ids from the master."""
+    import stripe
+
+    from app.database import dispose_engines
+    from app.services.events import debt_events
+
+    dispose_engines(close=False)
+    stripe.default_http_client = None
+    debt_events.reset()
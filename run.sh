@@ -1,11 +1,18 @@
 cd frontendcd frontend#!/bin/bash
 # Build frontend and run combined app
+#   ./run.sh        development server with auto-reload
+#   ./run.sh prod   gunicorn with one uvicorn worker per core (see gunicorn.conf.py)
 set -e
 cd "$(dirname "$0")"
 
 echo "Building frontend..."
 cd frontend && npm run build && cd ..
 
-echo "Starting server..."
 source venv/bin/activate 2>/dev/null || true
+python scripts/precompress_assets.py
+
+echo "Starting server..."
+if [ "$1" = "prod" ]; then
+  exec gunicorn -c gunicorn.conf.py app.main:app
+fi
 uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Move debts whose repayment plan has ended into the archive table.
+Run from project root: python scripts/archive_debts.py [--grace-days 90]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import settings, shard_session_factories
+from app.services.archive import archive_debts, archive_lock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive ended medical debts.")
+    parser.add_argument("--grace-days", type=int, default=settings.archive_grace_days)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    count = 0
+    for session_factory in shard_session_factories():
+        db = session_factory()
+        try:
+            with archive_lock(db.get_bind()) as acquired:
+                if not acquired:
+                    print("Another process is archiving this database; skipped.")
+                    continue
+                count += archive_debts(db, grace_days=args.grace_days, batch_size=args.batch_size)
+        finally:
+            db.close()
+    print(f"Archived {count} debt(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the CRUD routes under gunicorn with 1..N workers.
+Run from project root: python scripts/bench_workers.py [--workers 1,2,4] [--duration 10]
+
+Uses a throwaway SQLite file unless DATABASE_URL is set (use PostgreSQL for
+write-heavy runs: SQLite serializes writers across processes). Rate limiting
+and the archiver are disabled so only request handling is measured. Load is
+generated from this machine, so leave cores free for the clients.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SEED_DEBTS = 200
+# (weight, method, path template); {id} is filled with a random seeded debt id
+MIX = [
+    (70, "GET", "/debts?limit=20"),
+    (10, "GET", "/debts/{id}"),
+    (10, "GET", "/debts/{id}/summary"),
+    (5, "POST", "/debts"),
+    (5, "PATCH", "/debts/{id}"),
+]
+
+
+def _body(method: str) -> str | None:
+    if method == "POST":
+        return json.dumps({
+            "patient_name": f"Bench {random.randint(1, 10**6)}",
+            "income": random.randint(20000, 120000),
+            "debt_amount": random.randint(500, 30000),
+            "credit_score": random.randint(450, 820),
+            "provider": random.choice(["Carle Hospital", "OSF Healthcare", "Christie Clinic"]),
+        })
+    if method == "PATCH":
+        return json.dumps({"repayment_months": random.randint(6, 60)})
+    return None
+
+
+def _client(port: int, ids: list[int], deadline: float, seed: int) -> tuple[int, int, list[float]]:
+    random.seed(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    weights = [w for w, _, _ in MIX]
+    ok = errors = 0
+    latencies = []
+    while time.time() < deadline:
+        _, method, path = random.choices(MIX, weights)[0]
+        path = path.format(id=random.choice(ids))
+        body = _body(method)
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status < 400:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return ok, errors, latencies
+
+
+def _wait_ready(port: int, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _seed(port: int) -> list[int]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    ids = []
+    for _ in range(SEED_DEBTS):
+        conn.request("POST", "/debts", body=_body("POST"), headers={"Content-Type": "application/json"})
+        ids.append(json.loads(conn.getresponse().read())["id"])
+    conn.close()
+    return ids
+
+
+def run(workers: int, duration: float, clients: int, port: int, env: dict) -> dict:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=ROOT,
+        env={**env, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port)
+        ids = _seed(port)
+        deadline = time.time() + duration
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.starmap(_client, [(port, ids, deadline, i) for i in range(clients)])
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    latencies = sorted(lat for r in results for lat in r[2])
+    return {
+        "workers": workers,
+        "rps": ok / duration,
+        "errors": errors,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+    }
+
+
+def main():
+    cores = multiprocessing.cpu_count()
+    default_workers = sorted({1, *[n for n in (2, 4, 8, 16) if n <= cores], cores})
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per run")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent client processes")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "false", "ARCHIVE_INTERVAL_SECONDS": "0", "ACCESS_LOG": ""}
+    tmpdir = None
+    if "DATABASE_URL" not in os.environ:
+        tmpdir = tempfile.TemporaryDirectory()
+
+    print(f"{cores} cores, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(",")]:
+        if tmpdir:
+            env["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/bench_{workers}.db"
+        result = run(workers, args.duration, args.clients, args.port, env)
+        baseline = baseline or result["rps"]
+        print(
+            f"{result['workers']:>7} {result['rps']:>9.1f} {result['rps'] / baseline:>7.2f}x "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['errors']:>7}"
+        )
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Write .gz (and .br, if brotli is installed) sidecars next to built frontend assets.
+Run after `npm run build`: python scripts/precompress_assets.py
+"""
+import gzip
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.middleware.compression import COMPRESSIBLE_SUFFIXES, brotli
+
+ASSETS_DIR = Path(__file__).resolve().parent.parent / "frontend" / "dist" / "assets"
+MIN_SIZE = 500
+
+
+def precompress():
+    if not ASSETS_DIR.exists():
+        print(f"{ASSETS_DIR} not found. Run 'cd frontend && npm run build' first.")
+        return
+    written = 0
+    for path in sorted(ASSETS_DIR.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        data = path.read_bytes()
+        if len(data) < MIN_SIZE:
+            continue
+        path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        written += 1
+        if brotli is not None:
+            path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+            written += 1
+    print(f"Wrote {written} precompressed sidecar(s) in {ASSETS_DIR}")
+
+
+if __name__ == "__main__":
+    precompress()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Recompute the provider_risk_daily rollups from medical_debts and the archive.
+Run from project root after backfills or bulk loads: python scripts/rebuild_rollups.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import shard_session_factories
+from app.services.rollups import rebuild_rollups
+
+
+def main():
+    buckets = 0
+    for session_factory in shard_session_factories():
+        db = session_factory()
+        try:
+            buckets += rebuild_rollups(db)
+        finally:
+            db.close()
+    print(f"Rebuilt {buckets} provider/day/risk-level bucket(s).")
+
+
+if __name__ == "__main__":
+    main()
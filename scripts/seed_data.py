@@ -9,9 +9,12 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from app.database import SessionLocal, engine
-from app.models import Base, MedicalDebt
+from app.database import ShardSessions, shard_map
+from app.migrations import migrate_shards
+from app.models import MedicalDebt
+from app.services.dedup import debt_fingerprint
 from app.services.risk_engine import calculate_risk
+from app.services.rollups import contribution, record_debt_change
 
 SAMPLE_DEBTS = [
     {"patient_name": "Jane Doe", "income": 55000, "debt_amount": 12000, "credit_score": 640, "provider": "Carle Hospital"},
@@ -26,14 +29,15 @@ SAMPLE_DEBTS = [
 
 
 def seed():
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
+    migrate_shards(shard_map)
+    shards = ShardSessions(shard_map)
     try:
-        count = db.query(MedicalDebt).count()
+        count = sum(shards.fan_out(lambda db: db.query(MedicalDebt).count()))
         if count > 0:
             print(f"Database already has {count} records. Skipping seed.")
             return
         for data in SAMPLE_DEBTS:
+            db = shards.for_provider(data["provider"])
             result = calculate_risk(
                 debt_amount=data["debt_amount"],
                 income=data["income"],
@@ -55,12 +59,14 @@ def seed():
                 risk_level=result.risk_level,
                 recommended_monthly_payment=result.recommended_monthly_payment,
                 total_interest=result.total_interest,
+                fingerprint=debt_fingerprint(data["patient_name"], data["provider"], data["debt_amount"]),
             )
             db.add(record)
-        db.commit()
+            record_debt_change(db, None, contribution(record))
+        shards.commit()
         print(f"Seeded {len(SAMPLE_DEBTS)} medical debt records.")
     finally:
-        db.close()
+        shards.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""
+Shared fixtures. Tests run on temp SQLite files, so no server or PostgreSQL
+is needed: either the configured primary/replica pair, or fresh files per test
+wired in place of the configured databases.
+"""
+import os
+import tempfile
+
+# Settings are read at import time: keep the databases out of the working tree
+# and turn off startup work the fixtures do themselves. Nothing replicates from
+# the primary file to the replica file, so tests can see which one served a read.
+_tmp = tempfile.mkdtemp(prefix="medipay_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/primary.db"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{_tmp}/replica.db"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["RUN_MIGRATIONS_ON_STARTUP"] = "false"
+os.environ["ARCHIVE_INTERVAL_SECONDS"] = "0"
+os.environ["SLOW_QUERY_THRESHOLD_MS"] = "-1"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.database import Shard, ShardMap, _create_engine
+from app.main import app
+from app.migrations import migrate_shards, run_migrations
+from app.routers import debts
+
+
+@pytest.fixture
+def primary_and_replica():
+    """The configured primary and replica files, migrated; rows are removed after the test."""
+    engines = (database.engine, database.read_engine)
+    for engine in engines:
+        run_migrations(engine)
+    yield engines
+    for engine in engines:
+        with engine.begin() as conn:
+            for table in reversed(database.Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+
+@pytest.fixture
+def use_databases(tmp_path, monkeypatch):
+    """
+    Point the app at fresh temp SQLite files, one per shard:
+    `use_databases(shards=3, pinned={...})` returns the ShardMap.
+    """
+    engines = []
+
+    def configure(shards: int = 1, pinned: dict[str, int] | None = None) -> ShardMap:
+        def new_engine(name: str):
+            engines.append(_create_engine(f"sqlite:///{tmp_path / name}.db"))
+            return engines[-1]
+
+        shard_list = []
+        for n in range(shards):
+            shard_engine = new_engine(f"shard{n}")
+            shard_list.append(Shard(n, shard_engine, shard_engine))
+        shard_map = ShardMap(shard_list, pinned)
+        migrate_shards(shard_map)
+        primary = shard_list[0].engine
+        monkeypatch.setattr(database, "engine", primary)
+        monkeypatch.setattr(database, "read_engine", primary)
+        monkeypatch.setattr(database, "shard_map", shard_map)
+        monkeypatch.setattr(debts, "shard_map", shard_map)
+        return shard_map
+
+    yield configure
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def shards(use_databases):
+    """One fresh shard; test modules needing more override this fixture."""
+    return use_databases()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def payload():
+    """Build a POST /debts body: `payload("Jane Doe", "Carle Hospital", 1200.0)`."""
+    def make(patient_name: str = "Jane Doe", provider: str = "Carle Hospital", debt_amount: float = 1000.0) -> dict:
+        return {
+            "patient_name": patient_name,
+            "income": 55000,
+            "debt_amount": debt_amount,
+            "credit_score": 680,
+            "provider": provider,
+        }
+    return make
+
@@ -0,0 +1,51 @@
+"""
+Admin slow-query endpoints: token guard and plan capture.
+"""
+from app import database
+from app.services.query_log import explain
+
+
+def test_admin_routes_closed_without_token(shards, client, monkeypatch):
+    monkeypatch.setattr(database.settings, "admin_token", "")
+    assert client.get("/admin/slow-queries").status_code == 403
+    assert client.delete("/admin/slow-queries", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_admin_routes_require_matching_token(shards, client, monkeypatch):
+    monkeypatch.setattr(database.settings, "admin_token", "s3cret")
+    assert client.get("/admin/slow-queries").status_code == 403
+    assert client.get("/admin/slow-queries", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/admin/slow-queries", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "queries" in response.json()
+    assert client.delete("/admin/slow-queries", headers={"X-Admin-Token": "s3cret"}).status_code == 204
+
+
+class _FailingExplainConnection:
+    """DB-API stand-in whose EXPLAIN fails, recording every statement issued."""
+    autocommit = False
+
+    def __init__(self):
+        self.executed = []
+
+    @property
+    def connection(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement.split(" (")[0])
+        if statement.startswith("EXPLAIN"):
+            raise RuntimeError("syntax error")
+
+    def close(self):
+        pass
+
+
+def test_failed_postgres_explain_rolls_back_to_savepoint():
+    conn = _FailingExplainConnection()
+    plan = explain("postgresql", conn, "SELECT 1", ())
+    assert plan[0].startswith("EXPLAIN failed")
+    assert conn.executed == ["SAVEPOINT medipay_explain", "EXPLAIN SELECT 1", "ROLLBACK TO SAVEPOINT medipay_explain"]
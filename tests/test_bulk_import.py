@@ -0,0 +1,41 @@
+"""
+Bulk import: duplicates are reported, and rollups are written once per bucket.
+"""
+from sqlalchemy import event
+
+
+def test_bulk_import_reports_duplicates(shards, client, payload):
+    existing_id = client.post("/debts", json=payload("Jane Doe", "Carle Hospital")).json()["id"]
+    batch = [
+        payload("jane  doe", "Carle Hospital"),  # matches the stored debt
+        payload("John Smith", "OSF Healthcare"),
+        payload("John Smith", "OSF Healthcare"),  # repeats index 1
+    ]
+    body = client.post("/debts/bulk", json=batch).json()
+    assert len(body["created"]) == 1
+    assert {(d["index"], d["existing_id"], d["duplicate_of_index"]) for d in body["duplicates"]} == {
+        (0, existing_id, None),
+        (2, None, 1),
+    }
+
+
+def test_bulk_import_upserts_rollups_per_bucket(shards, client, payload):
+    statements = []
+
+    def count_rollup_writes(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO provider_risk_daily"):
+            statements.append(statement)
+
+    engine = shards.shards[0].engine
+    event.listen(engine, "before_cursor_execute", count_rollup_writes)
+    try:
+        batch = [payload(f"Patient {i}", ("Carle Hospital", "OSF Healthcare")[i % 2], 500 + i) for i in range(200)]
+        response = client.post("/debts/bulk", json=batch)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_rollup_writes)
+
+    assert response.status_code == 201
+    assert len(response.json()["created"]) == 200
+    assert 2 <= len(statements) <= 6  # one per (provider, risk level) touched
+    exposure = {row["provider"]: row["debt_count"] for row in client.get("/analytics/providers").json()}
+    assert exposure == {"Carle Hospital": 100, "OSF Healthcare": 100}
@@ -0,0 +1,101 @@
+"""
+Change feed: per-worker id spaces, shutdown and the feed shared through Redis.
+"""
+import asyncio
+
+from app.services.events import CLOSED, EventBus, RedisEventBus, _stream_seq
+
+
+def test_reset_starts_a_new_id_space():
+    bus = EventBus()
+    first = bus.publish("debt.created", {"id": 1})
+    bus.reset()
+    second = bus.publish("debt.created", {"id": 2})
+    assert first.id.split("-")[0] != second.id.split("-")[0]
+    assert second.seq == 1
+
+    async def resume(last_event_id):
+        queue, replay = bus.subscribe(last_event_id)
+        bus.unsubscribe(queue)
+        return replay
+
+    # An id from before the reset (e.g. issued by the master) cannot be replayed here
+    assert asyncio.run(resume(first.id)) is None
+    assert asyncio.run(resume(second.id)) == []
+
+
+def test_close_ends_current_and_later_subscribers():
+    async def scenario():
+        bus = EventBus(subscriber_queue_size=2)
+        queue, _ = bus.subscribe()
+        for n in range(3):
+            bus.publish("debt.updated", {"id": n})  # overflows: backlog replaced by a reset
+        bus.close()
+        await asyncio.sleep(0)
+        drained = [queue.get_nowait() for _ in range(queue.qsize())]
+        late, _ = bus.subscribe()
+        return drained, late.get_nowait()
+
+    drained, late = asyncio.run(scenario())
+    assert drained[-1] is CLOSED
+    assert late is CLOSED
+
+
+class _FakeRedisStream:
+    """Just enough of the sync and asyncio Redis clients for one stream."""
+
+    def __init__(self):
+        self.entries = []
+
+    def xadd(self, stream, fields, maxlen=None, approximate=True):
+        entry_id = f"1700000000000-{len(self.entries)}"
+        self.entries.append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xrevrange(self, stream, count=None):
+        return list(reversed(self.entries))[:count]
+
+    async def xread(self, streams, count=None, block=None):
+        (last_id,) = streams.values()
+        newer = [e for e in self.entries if _stream_seq(e[0]) > _stream_seq(last_id)]
+        if not newer:
+            await asyncio.sleep(0.01)
+            return []
+        return [("medipay:debt-events", newer[:count])]
+
+    async def aclose(self):
+        pass
+
+
+class _FakeRedisEventBus(RedisEventBus):
+    def __init__(self, redis_stream):
+        self._client = redis_stream
+        self._stream = "medipay:debt-events"
+        self._log_every = 60.0
+        self._last_error_log = 0.0
+        EventBus.__init__(self)
+
+    def _async_client(self):
+        return self._client
+
+
+def test_workers_share_the_redis_feed():
+    redis_stream = _FakeRedisStream()
+    worker_a, worker_b = _FakeRedisEventBus(redis_stream), _FakeRedisEventBus(redis_stream)
+    worker_a.publish("debt.created", {"id": 1})  # before either worker tails the stream
+
+    async def scenario():
+        feeds = [asyncio.create_task(worker.run()) for worker in (worker_a, worker_b)]
+        await asyncio.sleep(0.05)
+        queue_b, _ = worker_b.subscribe()
+        worker_a.publish("debt.updated", {"id": 1})
+        event = await asyncio.wait_for(queue_b.get(), timeout=1)
+        # A client that saw the first entry through worker A resumes against worker B
+        _, replay = worker_b.subscribe(redis_stream.entries[0][0])
+        for feed in feeds:
+            feed.cancel()
+        return event, replay
+
+    event, replay = asyncio.run(scenario())
+    assert (event.type, event.data, event.id) == ("debt.updated", {"id": 1}, redis_stream.entries[1][0])
+    assert [e.type for e in replay] == ["debt.updated"]
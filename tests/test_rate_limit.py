@@ -0,0 +1,43 @@
+"""
+Admission control for long-lived change-feed streams.
+"""
+import asyncio
+
+from app.middleware.rate_limit import RateLimiter, RateLimitMiddleware
+
+
+def _scope(client_host: str) -> dict:
+    return {"type": "http", "method": "GET", "path": "/debts/events", "headers": [], "client": (client_host, 5000)}
+
+
+def test_stream_caps_per_client_and_per_process():
+    limiter = RateLimiter(default_limit=None, route_limits=(), max_streams=3, max_client_streams=2)
+    release = asyncio.Event()
+
+    async def stream_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await release.wait()
+
+    middleware = RateLimitMiddleware(stream_app, limiter)
+
+    async def open_stream(host: str, statuses: list) -> None:
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+        await middleware(_scope(host), None, send)
+
+    async def scenario():
+        statuses = []
+        tasks = [asyncio.create_task(open_stream(host, statuses)) for host in ("a", "a", "a", "b", "c")]
+        await asyncio.sleep(0.01)
+        open_during = limiter.streams
+        release.set()
+        await asyncio.gather(*tasks)
+        return statuses, open_during
+
+    statuses, open_during = asyncio.run(scenario())
+    # Third stream from "a" hits the client cap; "c" finds the process full
+    assert statuses == [200, 200, 429, 200, 503]
+    assert open_during == 3
+    assert limiter.streams == 0 and not limiter._client_streams
+    assert limiter.rejected == {"client_streams": 1, "streams": 1}
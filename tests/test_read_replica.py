@@ -0,0 +1,75 @@
+"""
+Read/write routing between the configured primary and replica, two SQLite
+files with nothing replicating between them, so where a row is visible shows
+which database served the request.
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database import PRIMARY_STICKY_COOKIE, ReadSessionLocal
+from app.models import MedicalDebt
+
+
+def _insert(engine, **overrides) -> int:
+    values = dict(
+        patient_name="Replica Only", income=40000, debt_amount=900, credit_score=700,
+        provider="OSF Healthcare", risk_score=0.1, risk_level="Low",
+        recommended_monthly_payment=37.5, total_interest=0,
+    )
+    values.update(overrides)
+    with Session(engine) as db:
+        record = MedicalDebt(**values)
+        db.add(record)
+        db.commit()
+        return record.id
+
+
+def test_get_reads_from_replica(primary_and_replica, client):
+    _, replica = primary_and_replica
+    debt_id = _insert(replica)
+
+    response = client.get(f"/debts/{debt_id}")
+    assert response.status_code == 200
+    assert response.json()["patient_name"] == "Replica Only"
+    assert client.get("/debts").json()["total"] == 1
+    assert client.get(f"/debts/{debt_id}/summary").status_code == 200
+
+
+def test_writes_go_to_primary(primary_and_replica, client, payload):
+    primary, replica = primary_and_replica
+    response = client.post("/debts", json=payload(debt_amount=1200.0))
+    assert response.status_code == 201
+    debt_id = response.json()["id"]
+
+    with Session(primary) as db:
+        assert db.get(MedicalDebt, debt_id) is not None
+    with Session(replica) as db:
+        assert db.query(MedicalDebt).count() == 0
+
+
+def test_sticky_cookie_routes_next_read_to_primary(primary_and_replica, client, payload):
+    response = client.post("/debts", json=payload(debt_amount=1200.0))
+    assert PRIMARY_STICKY_COOKIE in response.cookies
+    debt_id = response.json()["id"]
+
+    # The write is only on the primary; the cookie makes this read find it
+    assert client.get(f"/debts/{debt_id}").status_code == 200
+
+    client.cookies.clear()
+    assert client.get(f"/debts/{debt_id}").status_code == 404
+
+
+def test_expired_cookie_reads_from_replica(primary_and_replica, client, payload):
+    debt_id = client.post("/debts", json=payload(debt_amount=1200.0)).json()["id"]
+    client.cookies.set(PRIMARY_STICKY_COOKIE, "0")
+    assert client.get(f"/debts/{debt_id}").status_code == 404
+
+
+def test_read_only_session_refuses_writes(primary_and_replica):
+    db = ReadSessionLocal()
+    try:
+        db.add(MedicalDebt(patient_name="x"))
+        with pytest.raises(RuntimeError):
+            db.flush()
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+"""
+Provider rollups group spellings of a provider the way sharding and dedup do.
+"""
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.migrations.versions import normalized_rollup_keys
+from app.models import ProviderRiskDaily
+
+
+def test_spellings_of_a_provider_share_one_bucket(shards, client, payload):
+    client.post("/debts", json=payload("Jane Doe", "Carle Hospital", 1000.0))
+    client.post("/debts", json=payload("John Roe", "  carle   HOSPITAL ", 500.0))
+    exposure = client.get("/analytics/providers").json()
+    assert [(row["provider"], row["debt_count"]) for row in exposure] == [("carle   HOSPITAL", 2)]
+    trend = client.get("/analytics/providers/CARLE HOSPITAL/trend", params={"days": 1}).json()
+    assert trend["points"][-1]["total_outstanding"] == 1500.0
+
+
+def test_migration_merges_buckets_keyed_on_raw_spellings(shards):
+    engine = shards.shards[0].engine
+    today = date.today()
+    with Session(engine) as db:
+        for provider, amount in (("Carle Hospital", 1000.0), ("carle hospital", 500.0), ("OSF", 200.0)):
+            db.add(ProviderRiskDaily(
+                day=today, provider=provider, risk_level="High",
+                debt_count=1, total_outstanding=amount, weighted_risk_sum=amount * 0.8,
+            ))
+        db.commit()
+
+    normalized_rollup_keys(engine)
+    with Session(engine) as db:
+        rows = db.scalars(select(ProviderRiskDaily).order_by(ProviderRiskDaily.provider)).all()
+    assert [(r.provider, r.debt_count, r.total_outstanding) for r in rows] == [
+        ("carle hospital", 2, 1500.0),
+        ("osf", 1, 200.0),
+    ]
+    assert rows[1].provider_name == "OSF"
@@ -0,0 +1,134 @@
+"""
+Provider sharding across three temp SQLite files.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SHARD_ID_BITS, shard_of_id
+from app.models import MedicalDebt, ProviderRiskDaily
+
+PROVIDERS = ["Carle Hospital", "OSF Healthcare", "Christie Clinic", "Memorial Health", "Mayo Clinic", "Rush"]
+
+
+def _stored_on(shard) -> set[int]:
+    with Session(shard.engine) as db:
+        return set(db.scalars(select(MedicalDebt.id)))
+
+
+@pytest.fixture
+def shards(use_databases):
+    return use_databases(shards=3, pinned={"Carle Hospital": 2})
+
+
+def test_providers_route_to_their_shard(shards, client, payload):
+    for i, provider in enumerate(PROVIDERS):
+        debt_id = client.post("/debts", json=payload(f"P{i}", provider)).json()["id"]
+        shard = shards.for_provider(provider)
+        assert shard_of_id(debt_id) == shard.id
+        assert debt_id >= shard.id << SHARD_ID_BITS
+        assert debt_id in _stored_on(shard)
+
+
+def test_pinned_tenant_ignores_case_and_spacing(shards, client, payload):
+    assert shards.for_provider("  carle   HOSPITAL ").id == 2
+    debt_id = client.post("/debts", json=payload("Jane Doe", "carle hospital")).json()["id"]
+    assert shard_of_id(debt_id) == 2
+    # Same fingerprint, same shard: the duplicate is caught
+    assert client.post("/debts", json=payload("jane doe", "Carle  Hospital")).status_code == 409
+
+
+def test_shards_allocate_disjoint_id_ranges(shards, client, payload):
+    for shard in shards:
+        provider = next(p for p in PROVIDERS + [f"Extra {n}" for n in range(50)] if shards.for_provider(p) is shard)
+        first = client.post("/debts", json=payload("First", provider)).json()["id"]
+        assert first == shard.id << SHARD_ID_BITS or (shard.id == 0 and first == 1)
+
+
+def test_get_patch_delete_route_by_id(shards, client, payload):
+    ids = [client.post("/debts", json=payload(f"P{i}", p)).json()["id"] for i, p in enumerate(PROVIDERS)]
+    for debt_id in ids:
+        assert client.get(f"/debts/{debt_id}").json()["id"] == debt_id
+        assert client.get(f"/debts/{debt_id}/summary").status_code == 200
+        patched = client.patch(f"/debts/{debt_id}", json={"income": 90000})
+        assert patched.status_code == 200
+        assert patched.json()["income"] == 90000
+    assert client.delete(f"/debts/{ids[0]}").status_code == 204
+    assert client.get(f"/debts/{ids[0]}").status_code == 404
+    assert ids[0] not in _stored_on(shards.for_provider(PROVIDERS[0]))
+    # Ids from an unconfigured shard are simply not found
+    assert client.get(f"/debts/{7 << SHARD_ID_BITS}").status_code == 404
+    assert client.delete(f"/debts/{7 << SHARD_ID_BITS}").status_code == 204
+
+
+def test_list_fans_out_and_pages_with_offset(shards, client, payload):
+    ids = [client.post("/debts", json=payload(f"P{i}", PROVIDERS[i % 6], 100 + i)).json()["id"] for i in range(14)]
+    assert len({shard_of_id(i) for i in ids}) > 1
+
+    full = client.get("/debts", params={"limit": 100}).json()
+    assert full["total"] == 14
+    assert [d["id"] for d in full["items"]] == ids[::-1]  # newest first across shards
+
+    paged = []
+    for offset in range(0, 14, 4):
+        page = client.get("/debts", params={"limit": 4, "offset": offset}).json()
+        assert page["total"] == 14
+        paged += [d["id"] for d in page["items"]]
+    assert paged == ids[::-1]
+
+    filtered = client.get("/debts", params={"provider": "Carle"}).json()
+    assert {d["provider"] for d in filtered["items"]} == {"Carle Hospital"}
+
+
+def test_bulk_import_spans_shards(shards, client, payload):
+    batch = [payload(f"B{i}", PROVIDERS[i % 6], 200 + i) for i in range(12)]
+    batch.append(payload("B0", PROVIDERS[0], 200))  # repeats index 0
+    body = client.post("/debts/bulk", json=batch).json()
+    assert len(body["created"]) == 12
+    assert body["duplicates"] == [{"index": 12, "existing_id": None, "duplicate_of_index": 0}]
+    for debt_id, payload in zip(body["created"], batch):
+        assert debt_id in _stored_on(shards.for_provider(payload["provider"]))
+    assert client.get("/debts").json()["total"] == 12
+
+
+def test_patch_to_provider_on_another_shard_is_rejected(shards, client, payload):
+    debt_id = client.post("/debts", json=payload("Jane Doe", "Carle Hospital")).json()["id"]
+    other = next(p for p in PROVIDERS if shards.for_provider(p).id != 2)
+    response = client.patch(f"/debts/{debt_id}", json={"provider": other})
+    assert response.status_code == 400
+    assert client.get(f"/debts/{debt_id}").json()["provider"] == "Carle Hospital"
+    # Renaming within the same shard is fine
+    assert client.patch(f"/debts/{debt_id}", json={"provider": "CARLE HOSPITAL"}).status_code == 200
+
+
+def test_patch_rejects_null_provider_and_patient_name(shards, client, payload):
+    debt_id = client.post("/debts", json=payload("Jane Doe", "Carle Hospital")).json()["id"]
+    for field in ("provider", "patient_name", "debt_amount"):
+        assert client.patch(f"/debts/{debt_id}", json={field: None}).status_code == 422
+    record = client.get(f"/debts/{debt_id}").json()
+    assert (record["patient_name"], record["provider"]) == ("Jane Doe", "Carle Hospital")
+
+
+def test_exposure_merges_a_provider_split_across_shards(shards, client):
+    today = date.today()
+    for shard, amount in ((shards.shards[0], 1000.0), (shards.shards[1], 500.0)):
+        with Session(shard.engine) as db:
+            db.add(ProviderRiskDaily(
+                day=today, provider="resharded", provider_name="Resharded", risk_level="High",
+                debt_count=1, total_outstanding=amount, weighted_risk_sum=amount * 0.8,
+            ))
+            db.commit()
+    exposure = [row for row in client.get("/analytics/providers").json() if row["provider"] == "Resharded"]
+    assert len(exposure) == 1
+    assert exposure[0]["debt_count"] == 2
+    assert exposure[0]["total_outstanding"] == 1500.0
+    trend = client.get("/analytics/providers/Resharded/trend", params={"days": 1}).json()
+    assert trend["points"][-1]["debt_count"] == 2
+
+
+def test_up_to_date_shards_are_left_alone(shards):
+    from app.migrations import migrate_shards
+
+    assert migrate_shards(shards) == {0: [], 1: [], 2: []}